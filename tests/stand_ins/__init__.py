@@ -0,0 +1,4 @@
+"""
+In-process stand-ins for the remote services used by the backends, so that
+backends can be tested and benchmarked without docker.
+"""
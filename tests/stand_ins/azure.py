@@ -0,0 +1,105 @@
+"""
+An in-memory stand-in for an Azure blob container, implementing the parts of
+ContainerClient and BlobClient used by AzureBlobStorageBackend. Each call
+waits for a round trip over the given link, in the calling thread, so
+concurrent calls overlap as they would against a real service.
+"""
+import json
+import threading
+from types import SimpleNamespace
+from typing import Dict, Optional
+from unittest import mock
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError, HttpResponseError
+from views_storage.backends import azure
+from .latency import Link
+
+# Max. total size of the metadata of a blob
+METADATA_LIMIT = 8 * 1024
+
+
+class FakeContainerClient():
+    """
+    FakeContainerClient
+    ===================
+
+    parameters:
+        link (Optional[Link]): Link to delay calls by = None
+    """
+
+    def __init__(self, link: Optional[Link] = None):
+        self.link = link if link is not None else Link()
+        self._blobs: Dict[str, bytes] = {}
+        self._metadata: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def get_blob_client(self, name: str) -> "FakeBlobClient":
+        return FakeBlobClient(self, name)
+
+    def list_blobs(self):
+        self.link.wait()
+        with self._lock:
+            return [SimpleNamespace(name = name) for name in sorted(self._blobs)]
+
+    def close(self):
+        pass
+
+    def patch(self):
+        """
+        Makes AzureBlobStorageBackend instances use this container,
+        regardless of their connection string and container name.
+        """
+        return mock.patch.object(azure.AzureBlobStorageBackend, "_connect", lambda backend: self)
+
+
+class FakeBlobClient():
+    def __init__(self, container: FakeContainerClient, name: str):
+        self._container = container
+        self._name = name
+
+    def exists(self) -> bool:
+        self._container.link.wait()
+        with self._container._lock:
+            return self._name in self._container._blobs
+
+    def upload_blob(self, data, overwrite: bool = False):
+        data = data.encode() if isinstance(data, str) else bytes(data)
+        self._container.link.wait(sent = len(data))
+        with self._container._lock:
+            if self._name in self._container._blobs and not overwrite:
+                raise ResourceExistsError(f"{self._name} exists")
+            self._container._blobs[self._name] = data
+            self._container._metadata[self._name] = {}
+
+    def download_blob(self):
+        with self._container._lock:
+            data = self._get()
+        self._container.link.wait(received = len(data))
+        return SimpleNamespace(readall = lambda: data)
+
+    def delete_blob(self):
+        self._container.link.wait()
+        with self._container._lock:
+            self._get()
+            del self._container._blobs[self._name]
+            del self._container._metadata[self._name]
+
+    def get_blob_properties(self):
+        self._container.link.wait()
+        with self._container._lock:
+            return SimpleNamespace(
+                    size = len(self._get()),
+                    metadata = dict(self._container._metadata[self._name]))
+
+    def set_blob_metadata(self, metadata: Dict[str, str]):
+        self._container.link.wait(sent = len(json.dumps(metadata)))
+        if sum(len(k) + len(v) for k, v in metadata.items()) > METADATA_LIMIT:
+            raise HttpResponseError(message = "Metadata too large")
+        with self._container._lock:
+            self._get()
+            self._container._metadata[self._name] = dict(metadata)
+
+    def _get(self) -> bytes:
+        try:
+            return self._container._blobs[self._name]
+        except KeyError:
+            raise ResourceNotFoundError(f"{self._name} does not exist")
@@ -0,0 +1,33 @@
+"""
+A stand-in for the key database read by the Sftp backend. Sftp._db_connect
+is patched to return an in-memory SQLite database, with the public.sftp_cert
+table of tests/mock_key_db/init.sql.
+"""
+import os
+import sqlite3
+from unittest import mock
+from views_storage.backends import sftp
+
+INIT_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mock_key_db/init.sql")
+
+
+def connect() -> sqlite3.Connection:
+    con = sqlite3.connect(":memory:")
+    with open(INIT_SQL) as f:
+        con.executescript(f.read())
+    con.execute("attach ':memory:' as public")
+    con.execute("create table public.sftp_cert as select * from main.sftp_cert")
+    return con
+
+
+def patch():
+    """
+    patch
+    =====
+
+    returns:
+        A patcher (see unittest.mock), to be started and stopped
+
+    Makes Sftp backends fetch their key from the stand-in.
+    """
+    return mock.patch.object(sftp.Sftp, "_db_connect", lambda self: connect())
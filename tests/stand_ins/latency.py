@@ -0,0 +1,116 @@
+"""
+Latency and bandwidth injection for the stand-ins, so that backend
+performance can be measured as over a network link, on one machine.
+"""
+import time
+import queue
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class Link():
+    """
+    Link
+    ====
+
+    parameters:
+        latency (float): One-way delay in seconds = 0
+        bandwidth (Optional[float]): Bytes per second in each direction, unlimited if None = None
+    """
+
+    latency: float = 0.0
+    bandwidth: Optional[float] = None
+
+    def transfer_time(self, size: int) -> float:
+        return size / self.bandwidth if self.bandwidth else 0.0
+
+    def round_trip(self, sent: int = 0, received: int = 0) -> float:
+        """
+        Time taken by a request of sent bytes with a response of received
+        bytes, on an otherwise idle link.
+        """
+        return 2 * self.latency + self.transfer_time(sent) + self.transfer_time(received)
+
+    def wait(self, sent: int = 0, received: int = 0) -> None:
+        if (delay := self.round_trip(sent, received)) > 0:
+            time.sleep(delay)
+
+
+class _Pipe():
+    """
+    One direction of a delayed connection. Data read from source is written
+    to destination once it would have crossed the link, without blocking
+    further reads, so that pipelined requests overlap as on a real link.
+    """
+
+    def __init__(self, link: Link, source: socket.socket, destination: socket.socket, done):
+        self._link = link
+        self._source = source
+        self._destination = destination
+        self._done = done
+        self._queue = queue.Queue()
+        self._free_at = 0.0
+
+    def start(self):
+        threading.Thread(target = self._read, daemon = True).start()
+        threading.Thread(target = self._write, daemon = True).start()
+
+    def _read(self):
+        while True:
+            try:
+                data = self._source.recv(2 ** 16)
+            except OSError:
+                data = b""
+            sent_at = max(time.monotonic(), self._free_at)
+            self._free_at = sent_at + self._link.transfer_time(len(data))
+            self._queue.put((self._free_at + self._link.latency, data))
+            if not data:
+                return
+
+    def _write(self):
+        while True:
+            due, data = self._queue.get()
+            if (delay := due - time.monotonic()) > 0:
+                time.sleep(delay)
+            try:
+                if not data:
+                    self._destination.shutdown(socket.SHUT_WR)
+                    break
+                self._destination.sendall(data)
+            except OSError:
+                break
+        self._done()
+
+
+def delayed(sock: socket.socket, link: Link) -> socket.socket:
+    """
+    delayed
+    =======
+
+    parameters:
+        sock (socket.socket): A connected socket
+        link (Link)
+
+    returns:
+        socket.socket: A socket to use in place of sock
+
+    Relays data between sock and the returned socket through link, in both
+    directions. The sockets are closed once both sides have shut down.
+    """
+    inner, outer = socket.socketpair()
+    remaining = [2]
+    lock = threading.Lock()
+
+    def done():
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                sock.close()
+                outer.close()
+
+    _Pipe(link, sock, outer, done).start()
+    _Pipe(link, outer, sock, done).start()
+    return inner
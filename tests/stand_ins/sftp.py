@@ -0,0 +1,172 @@
+"""
+A minimal SFTP server serving a local directory, running in a background
+thread. Accepts any user and any public key.
+"""
+import os
+import socket
+import threading
+from typing import Optional
+import paramiko
+from . import latency
+
+TEST_KEY = paramiko.Ed25519Key.from_private_key_file(
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "testcert/test_priv"))
+
+
+class _Server(paramiko.ServerInterface):
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return "publickey"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+
+class _Handle(paramiko.SFTPHandle):
+    def stat(self):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def chattr(self, attr):
+        return paramiko.SFTP_OK
+
+
+class _SftpInterface(paramiko.SFTPServerInterface):
+    def __init__(self, server, root: str, *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self._root = root
+
+    def _real(self, path: str) -> str:
+        return os.path.join(self._root, self.canonicalize(path).lstrip("/"))
+
+    def _call(self, fn, *args):
+        try:
+            fn(*args)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def list_folder(self, path):
+        real = self._real(path)
+        try:
+            return [
+                paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(real, name)), name)
+                for name in os.listdir(real)]
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._real(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        real = self._real(path)
+        try:
+            fd = os.open(real, flags | getattr(os, "O_BINARY", 0), 0o666)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+
+        handle = _Handle(flags)
+        handle.filename = real
+        handle.readfile = handle.writefile = os.fdopen(fd, mode)
+        return handle
+
+    def remove(self, path):
+        return self._call(os.remove, self._real(path))
+
+    def rename(self, oldpath, newpath):
+        real_new = self._real(newpath)
+        if os.path.exists(real_new):
+            return paramiko.SFTP_FAILURE
+        return self._call(os.rename, self._real(oldpath), real_new)
+
+    def posix_rename(self, oldpath, newpath):
+        return self._call(os.replace, self._real(oldpath), self._real(newpath))
+
+    def mkdir(self, path, attr):
+        return self._call(os.mkdir, self._real(path))
+
+    def rmdir(self, path):
+        return self._call(os.rmdir, self._real(path))
+
+    def chattr(self, path, attr):
+        return paramiko.SFTP_OK
+
+
+class SftpServer():
+    """
+    SftpServer
+    ==========
+
+    parameters:
+        root (str): Local directory exposed as the root of the server
+        link (Optional[latency.Link]): Link to delay connections by = None
+
+    Listens on a free port on localhost. Use as a context manager, or call
+    start and stop.
+    """
+
+    def __init__(self, root: str, link: Optional[latency.Link] = None):
+        self.root = root
+        self.link = link
+        self.host = "127.0.0.1"
+        self._host_key = paramiko.RSAKey.generate(2048)
+        self._socket = None
+        self._transports = []
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._socket.getsockname()[1]
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, 0))
+        self._socket.listen(16)
+        self._thread = threading.Thread(target = self._serve, daemon = True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._socket.shutdown(socket.SHUT_RDWR)
+        self._socket.close()
+        for transport in self._transports:
+            transport.close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def _serve(self):
+        while True:
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                return
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.link is not None:
+                client = latency.delayed(client, self.link)
+            transport = paramiko.Transport(client)
+            transport.add_server_key(self._host_key)
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer, _SftpInterface, self.root)
+            transport.start_server(server = _Server())
+            self._transports.append(transport)
@@ -47,3 +47,10 @@ class TestAzureStorage(unittest.TestCase):
         self.assertTrue(azure_bs.exists("test"))
         self.assertIn("test", azure_bs.keys())
         self.assertEqual(azure_bs.retrieve("test").decode(), x)
+        self.assertEqual(azure_bs.size("test"), len(x))
+
+        azure_bs.store_metadata("test", {"size": 64})
+        self.assertEqual(azure_bs.retrieve_metadata("test"), {"size": 64})
+        azure_bs.store_metadata("test", {"columns": ["x" * 100] * 100})
+        self.assertEqual(azure_bs.retrieve_metadata("test"), {"columns": ["x" * 100] * 100})
+        self.assertEqual(azure_bs.keys(), ["test"])
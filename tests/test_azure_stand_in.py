@@ -0,0 +1,63 @@
+"""
+Tests for the Azure blob storage backend against an in-memory container,
+which run without docker. See test_azure for tests against Azurite.
+"""
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from views_storage.key_value_store import KeyValueStore
+from views_storage.backends import azure
+from views_storage.serializers import dispatch
+from tests.stand_ins.azure import FakeContainerClient
+from tests.stand_ins.latency import Link
+
+class TestAzureStandIn(unittest.TestCase):
+    def setUp(self):
+        self.container = FakeContainerClient()
+        patcher = self.container.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backend = azure.AzureBlobStorageBackend("UseDevelopmentStorage=true", "test")
+        self.addCleanup(self.backend.close)
+
+    def test_storage_driver(self):
+        self.backend.store("test", b"abc")
+        self.backend.store("test", b"abcd")
+        self.assertTrue(self.backend.exists("test"))
+        self.assertEqual(self.backend.retrieve("test"), b"abcd")
+        self.assertEqual(self.backend.size("test"), 4)
+        self.assertRaises(KeyError, lambda: self.backend.retrieve("nonexistent"))
+
+        self.backend.store_metadata("test", {"size": 64})
+        self.assertEqual(self.backend.retrieve_metadata("test"), {"size": 64})
+        self.backend.store_metadata("test", {"columns": ["x" * 100] * 100})
+        self.assertEqual(self.backend.retrieve_metadata("test"), {"columns": ["x" * 100] * 100})
+        self.assertEqual(self.backend.keys(), ["test"])
+
+        self.backend.delete("test")
+        self.assertEqual(self.container.list_blobs(), [])
+        self.assertRaises(KeyError, lambda: self.backend.delete("test"))
+
+    def test_key_value_store(self):
+        store = KeyValueStore(backend = self.backend, serializer = dispatch.Dispatch(), verify_checksums = True)
+        df = pd.DataFrame({"a": [1, 2, 3]})
+        store.write("df", df)
+        store.write("model", {"weights": (1, 2)})
+        pd.testing.assert_frame_equal(store.read("df"), df)
+        self.assertEqual(store.read("model"), {"weights": (1, 2)})
+        self.assertEqual(store.verify(deep = True), {"df": True, "model": True})
+
+    def test_link(self):
+        self.container.link = Link(latency = .02, bandwidth = 2 ** 20)
+        self.backend.store("key", bytes(2 ** 18))
+
+        start = time.perf_counter()
+        self.backend.retrieve("key")
+        # exists and download, the latter taking a quarter second at 1 MiB/s
+        self.assertGreaterEqual(time.perf_counter() - start, 4 * .02 + .25)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: self.backend.exists("key"), range(8)))
+        self.assertLess(time.perf_counter() - start, 8 * 2 * .02)
@@ -0,0 +1,65 @@
+import os
+import unittest
+import threading
+from views_storage.backends import connections
+
+class Connection():
+    def __init__(self):
+        self.open = True
+
+    def close(self):
+        self.open = False
+
+class TestConnections(unittest.TestCase):
+    def tearDown(self):
+        connections.close_all()
+
+    def test_shared_per_key_and_thread(self):
+        a = connections.get("a", Connection)
+        self.assertIs(connections.get("a", Connection), a)
+        self.assertIsNot(connections.get("b", Connection), a)
+
+        other = []
+        thread = threading.Thread(target = lambda: other.append(connections.get("a", Connection)))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], a)
+
+        thread = threading.Thread(target = lambda: other.append(connections.get("a", Connection, per_thread = False)))
+        thread.start()
+        thread.join()
+        self.assertIs(connections.get("a", Connection, per_thread = False), other[1])
+
+    def test_close_and_alive(self):
+        a = connections.get("a", Connection, close = Connection.close)
+        connections.close("a")
+        self.assertFalse(a.open)
+        b = connections.get("a", Connection, close = Connection.close, alive = lambda c: c.open)
+        self.assertIsNot(a, b)
+        b.open = False
+        self.assertIsNot(connections.get("a", Connection, alive = lambda c: c.open), b)
+
+    def test_closed_with_thread(self):
+        opened = []
+        thread = threading.Thread(target = lambda: opened.append(connections.get("a", Connection, close = Connection.close)))
+        thread.start()
+        thread.join()
+        self.assertFalse(opened[0].open)
+        self.assertEqual(list(connections._entries), [])
+
+        shared = []
+        thread = threading.Thread(target = lambda: shared.append(
+            connections.get("a", Connection, close = Connection.close, per_thread = False)))
+        thread.start()
+        thread.join()
+        self.assertTrue(shared[0].open)
+
+    def test_fork(self):
+        a = connections.get("a", Connection)
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.write(write, b"1" if connections.get("a", Connection) is not a else b"0")
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(os.read(read, 1), b"1")
@@ -1,6 +1,15 @@
 
+import os
+import pickle
+import sqlite3
 import unittest
+from unittest import mock
+import tempfile
+import pandas as pd
+from pandas.testing import assert_frame_equal
+import sqlalchemy as sa
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
 from views_storage.backends import sql
 
 class TestDbBackend(unittest.TestCase):
@@ -27,3 +36,109 @@ class TestDbBackend(unittest.TestCase):
 
     def test_bad_instantiation(self):
         self.assertRaises(KeyError, lambda: sql.Sql(self.engine, "nonexistent"))
+
+    def test_pickle(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'db.sqlite')}")
+            engine.execute("create table abc (x text not null primary key, y int, z text)")
+            backend = sql.Sql(engine, "abc")
+            backend.store("abc", {"y": 1, "z": "def"})
+            self.assertEqual(pickle.loads(pickle.dumps(backend)).retrieve("abc"), {"y": 1, "z": "def"})
+
+    def test_fork_with_old_sqlalchemy(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'db.sqlite')}")
+            engine.execute("create table abc (x text not null primary key, y int, z text)")
+            backend = sql.Sql(engine, "abc")
+            backend.store("abc", {"y": 1})
+            parent_pool = engine.pool
+
+            backend._engine_pid = -1
+            with mock.patch.object(engine, "dispose", side_effect = TypeError("unexpected keyword argument 'close'")):
+                self.assertEqual(backend.retrieve("abc"), {"y": 1, "z": None})
+            self.assertIsNot(engine.pool, parent_pool)
+
+    def test_is_retryable(self):
+        def error(orig, invalidated = False):
+            return sa.exc.OperationalError("select 1", {}, orig, connection_invalidated = invalidated)
+
+        class PgError(Exception):
+            def __init__(self, pgcode):
+                self.pgcode = pgcode
+
+        self.backend._engine.execute("drop table abc")
+        with self.assertRaises(sa.exc.OperationalError) as missing_table:
+            self.backend.retrieve("abc")
+        self.assertFalse(self.backend.is_retryable(missing_table.exception))
+        self.assertTrue(self.backend.is_retryable(error(sqlite3.OperationalError("database is locked"))))
+        self.assertTrue(self.backend.is_retryable(error(Exception("closed"), invalidated = True)))
+        for code in "40001", "40P01", "57P01", "08006":
+            self.assertTrue(self.backend.is_retryable(error(PgError(code))))
+        for code in "28P01", "42P01":
+            self.assertFalse(self.backend.is_retryable(error(PgError(code))))
+        self.assertFalse(self.backend.is_retryable(ValueError()))
+
+    def test_metadata(self):
+        self.assertRaises(KeyError, lambda: self.backend.retrieve_metadata("abc"))
+        self.backend.store_metadata("abc", {"size": 1})
+        self.backend.store_metadata("abc", {"size": 2})
+        self.backend.store_metadata("def", {"size": 3})
+        self.assertEqual(self.backend.retrieve_metadata("abc"), {"size": 2})
+        self.assertEqual(self.backend.retrieve_metadata_many(["abc", "def"]), {"abc": {"size": 2}, "def": {"size": 3}})
+        self.assertEqual(self.backend.retrieve_metadata_many(["abc", "ghi"], skip_missing = True), {"abc": {"size": 2}})
+        self.assertRaises(KeyError, lambda: self.backend.retrieve_metadata_many(["abc", "ghi"]))
+
+    def test_delete(self):
+        self.backend.store("abc", {"y": 1})
+        self.backend.store_metadata("abc", {"size": 1})
+        self.backend.delete("abc")
+        self.assertFalse(self.backend.exists("abc"))
+        self.assertRaises(KeyError, lambda: self.backend.retrieve_metadata("abc"))
+        self.assertRaises(KeyError, lambda: self.backend.delete("abc"))
+
+    def test_frames(self):
+        self.backend.store("a", {"y": 0, "z": "old"})
+        frame = pd.DataFrame({"x": [f"k{i}" for i in range(2500)] + ["a"], "y": range(2501), "z": "new"}).set_index("x")
+        frame.loc["k1", "z"] = None
+        self.backend.store_frame(frame, chunksize = 1000)
+
+        self.assertEqual(self.backend.retrieve("a"), {"y": 2500, "z": "new"})
+        self.assertEqual(self.backend.retrieve("k1"), {"y": 1, "z": None})
+        assert_frame_equal(self.backend.read_frame().sort_index(), frame.sort_index())
+        assert_frame_equal(self.backend.read_frame(keys = frame.index[:1200]).sort_index(), frame.iloc[:1200].sort_index())
+        assert_frame_equal(self.backend.read_frame(where = self.backend.columns.y < 3), frame.iloc[:3])
+        self.assertEqual(len(self.backend.read_frame(keys = [])), 0)
+        self.assertRaises(ValueError, lambda: self.backend.store_frame(pd.DataFrame({"x": ["a"], "q": [1]})))
+
+    def test_csv_stream(self):
+        frame = pd.DataFrame({"a": range(10), "b": ["x", None] * 5})
+        stream = sql._CsvStream(frame, 3)
+        data = b""
+        while (chunk := stream.read(7)):
+            data += chunk
+        self.assertEqual(data, frame.to_csv(header = False, index = False, na_rep = "\\N").encode())
+
+    def test_copy_frame(self):
+        frame = pd.DataFrame({"x": ["a", "b"], "y": [1, None], "z": ["c", None]})
+        self.assertEqual(frame["y"].dtype.kind, "f")
+
+        copied = []
+        cursor = mock.MagicMock()
+        cursor.copy_expert.side_effect = lambda statement, stream, size: copied.append(stream.read())
+        con = mock.MagicMock(dialect = postgresql.dialect())
+        con.connection.cursor.return_value = cursor
+        self.backend._copy_frame(con, self.backend._frame_rows(frame), chunksize = 1)
+
+        self.assertEqual(copied, [b"a,1,c\nb,\\N,\\N\n"])
+        self.assertEqual(cursor.copy_expert.call_args[0][0],
+                'copy _staging_abc (x, y, z) from stdin with (format csv, null \'\\N\')')
+        self.assertEqual([c[0][0] for c in cursor.execute.call_args_list], [
+            'create temporary table _staging_abc (like abc including defaults) on commit drop',
+            'delete from abc t using _staging_abc s where t.x = s.x',
+            "insert into abc (x, y, z) select x, y, z from _staging_abc",
+            ])
+        cursor.close.assert_called_once()
+
+        self.backend.store_frame(frame.set_index("x"))
+        self.assertEqual(self.backend.retrieve("a"), {"y": 1, "z": "c"})
+        self.assertEqual(self.backend.retrieve("b"), {"y": None, "z": None})
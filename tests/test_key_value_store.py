@@ -2,11 +2,36 @@
 These simple tests are just asserting that the key value store class works as
 intended, with two different mock backends.
 """
+import os
 import unittest
+from unittest import mock
 import tempfile
+from datetime import timedelta
+import numpy as np
+import pandas as pd
 from views_storage.key_value_store import KeyValueStore
-from views_storage.backends import local, dictionary
-from views_storage.serializers import pickle
+from views_storage import checksums
+from views_storage.backends import local, dictionary, sqlite, storage_backend
+from views_storage.serializers import pickle, parquet
+
+class MinimalBackend(storage_backend.StorageBackend):
+    """
+    Implements only the abstract methods.
+    """
+    def __init__(self):
+        self._dict = {}
+
+    def store(self, key, value):
+        self._dict[key] = value
+
+    def retrieve(self, key):
+        return self._dict[key]
+
+    def exists(self, key):
+        return key in self._dict
+
+    def keys(self):
+        return list(self._dict)
 
 class TestKeyValueStore(unittest.TestCase):
     def test_key_value_store_dict(self):
@@ -20,3 +45,113 @@ class TestKeyValueStore(unittest.TestCase):
             kv = KeyValueStore(backend = local.Local(tmp), serializer = pickle.Pickle())
             kv.write("foo","bar")
             self.assertEqual(kv.read("foo"), "bar")
+
+    def test_backend_without_metadata(self):
+        kv = KeyValueStore(backend = MinimalBackend(), serializer = pickle.Pickle(), verify_checksums = True)
+        kv.write("foo", "bar")
+        kv.write_many({"a": 1})
+        self.assertEqual(kv.read("foo"), "bar")
+        self.assertRaises(KeyError, lambda: kv.info("foo"))
+        self.assertFalse(kv.backend.supports_metadata)
+        self.assertRaises(ValueError, lambda: KeyValueStore(
+            backend = MinimalBackend(), serializer = pickle.Pickle(), versioned = True))
+
+    def test_info(self):
+        df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}).set_index("a")
+        with tempfile.TemporaryDirectory() as tmp:
+            backends = (
+                    dictionary.DictBackend(),
+                    local.Local(os.path.join(tmp, "local"), shard_depth = 1),
+                    sqlite.Sqlite(os.path.join(tmp, "db.sqlite3")))
+            for backend in backends:
+                kv = KeyValueStore(backend = backend, serializer = parquet.Parquet())
+                kv.write("df", df)
+                kv.write_many({"a/df": df})
+
+                info = kv.info("df")
+                self.assertEqual(info["serializer"], "Parquet")
+                self.assertEqual(info["type"], "DataFrame")
+                self.assertEqual(info["shape"], [3, 1])
+                self.assertEqual(info["columns"], ["b"])
+                self.assertEqual(info["dtypes"], ["object"])
+                self.assertEqual(info["index"], ["a"])
+                self.assertEqual(info["size"], len(backend.retrieve("df")))
+                self.assertEqual(kv.info_many(["df", "a/df"])["a/df"]["shape"], [3, 1])
+                self.assertEqual(list(kv.info_many(["df", "nonexistent"], skip_missing = True)), ["df"])
+                self.assertEqual(sorted(kv.list()), ["a/df", "df"])
+                self.assertRaises(KeyError, lambda: kv.info("nonexistent"))
+
+            kv = KeyValueStore(backend = dictionary.DictBackend(), serializer = pickle.Pickle())
+            kv.write("array", np.zeros((2, 3), dtype = "float32"))
+            self.assertEqual(kv.info("array")["shape"], [2, 3])
+            self.assertEqual(kv.info("array")["dtypes"], ["float32"])
+
+    def test_versioned(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for backend in dictionary.DictBackend(), local.Local(tmp):
+                kv = KeyValueStore(backend = backend, serializer = pickle.Pickle(), versioned = True, keep_versions = 2)
+                for value in "abc":
+                    kv.write("a/b", value, overwrite = True)
+
+                self.assertEqual(kv.read("a/b"), "c")
+                self.assertEqual(kv.read("a/b", version = 2), "b")
+                self.assertEqual([v["version"] for v in kv.versions("a/b")], [2, 3])
+                self.assertEqual(kv.info("a/b")["version"], 3)
+                self.assertRaises(KeyError, lambda: kv.read("a/b", version = 1))
+                self.assertEqual(kv.list(), ["a/b"])
+
+                kv.max_version_age = timedelta(0)
+                kv.prune("a/b")
+                self.assertEqual([v["version"] for v in kv.versions("a/b")], [3])
+                self.assertRaises(KeyError, lambda: kv.read("a/b", version = 2))
+                self.assertEqual(kv.read("a/b", version = 3), "c")
+
+        self.assertRaises(ValueError, lambda: KeyValueStore(
+            backend = dictionary.DictBackend(), serializer = pickle.Pickle(),
+            versioned = True, record_metadata = False))
+
+    def test_delete(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for backend in dictionary.DictBackend(), local.Local(tmp, index = True), sqlite.Sqlite(os.path.join(tmp, "db")):
+                kv = KeyValueStore(backend = backend, serializer = pickle.Pickle())
+                kv.write("key", "value")
+                backend.delete("key")
+                self.assertFalse(kv.exists("key"))
+                self.assertRaises(KeyError, lambda: kv.info("key"))
+                self.assertRaises(KeyError, lambda: backend.delete("key"))
+
+    def test_verify_checksums(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            backends = (
+                    dictionary.DictBackend(),
+                    local.Local(os.path.join(tmp, "local")),
+                    sqlite.Sqlite(os.path.join(tmp, "db.sqlite3")))
+            for backend in backends:
+                kv = KeyValueStore(backend = backend, serializer = pickle.Pickle(), verify_checksums = True)
+                kv.write_many({"a": "x" * 100, "b": "y" * 100, "c": "z" * 100})
+                self.assertEqual(kv.read("a"), "x" * 100)
+                self.assertTrue(kv.info("a")["checksum"].startswith(checksums.DEFAULT_ALGORITHM + ":"))
+
+                data = backend.retrieve("b")
+                backend.store("b", data[:-10])
+                backend.store("c", data.replace(b"y", b"q"))
+                self.assertRaises(checksums.ChecksumError, lambda: kv.read("b"))
+                self.assertRaises(checksums.ChecksumError, lambda: kv.read("c"))
+                self.assertEqual(kv.read_many(["a"]), {"a": "x" * 100})
+                self.assertRaises(checksums.ChecksumError, lambda: kv.read_many(["a", "c"]))
+                self.assertEqual(kv.verify(), {"a": True, "b": False, "c": True})
+                if isinstance(backend, sqlite.Sqlite):
+                    # Records are fetched in one batch
+                    with mock.patch.object(sqlite.Sqlite, "retrieve_metadata", side_effect = AssertionError):
+                        self.assertEqual(kv.verify(), {"a": True, "b": False, "c": True})
+                self.assertEqual(kv.verify(["a", "c", "missing"], deep = True), {"a": True, "c": False, "missing": False})
+
+        self.assertTrue(checksums.matches(b"abc", checksums.checksum(b"abc", "blake2b")))
+        self.assertIsNone(checksums.matches(b"abc", "unknown:00"))
+
+    @unittest.skipUnless(checksums.xxhash, "xxhash is not installed")
+    def test_xxhash_checksums(self):
+        self.assertEqual(checksums.DEFAULT_ALGORITHM, "xxh3_128")
+        self.assertEqual(checksums.checksum(b"abc", "xxh3_128"), "xxh3_128:06b05ab6733a618578af5f94892f3950")
+        self.assertTrue(checksums.matches(b"abc", checksums.checksum(b"abc", "xxh3_128")))
+        self.assertFalse(checksums.matches(b"abd", checksums.checksum(b"abc", "xxh3_128")))
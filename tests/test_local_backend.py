@@ -0,0 +1,65 @@
+import os
+import unittest
+import tempfile
+from unittest import mock
+from views_storage.backends import local
+
+class TestLocalBackend(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_atomic_overwrite(self):
+        backend = local.Local(self.tmp.name, fsync = True)
+        backend.store("key", b"old")
+        backend.store("key", b"new")
+        self.assertEqual(backend.retrieve("key"), b"new")
+        self.assertEqual(os.listdir(self.tmp.name), ["key"])
+
+    def test_failed_write_leaves_old_value(self):
+        backend = local.Local(self.tmp.name)
+        backend.store("key", b"old")
+        with mock.patch("os.replace", side_effect = OSError("disk full")):
+            self.assertRaises(OSError, lambda: backend.store("key", b"new"))
+        self.assertEqual(backend.retrieve("key"), b"old")
+        self.assertEqual(backend.keys(), ["key"])
+        self.assertEqual(os.listdir(self.tmp.name), ["key"])
+
+    def test_nested_keys(self):
+        backend = local.Local(self.tmp.name)
+        backend.store("a/b/c", b"abc")
+        backend.store("d", b"d")
+        self.assertEqual(backend.retrieve("a/b/c"), b"abc")
+        self.assertEqual(sorted(backend.keys()), ["a/b/c", "d"])
+
+    def test_sharding(self):
+        backend = local.Local(self.tmp.name, shard_depth = 2)
+        for key in ("foo", "bar/baz"):
+            backend.store(key, key.encode())
+            self.assertEqual(backend.retrieve(key), key.encode())
+            self.assertTrue(backend.exists(key))
+        self.assertEqual(sorted(backend.keys()), ["bar/baz", "foo"])
+        self.assertNotIn("foo", os.listdir(self.tmp.name))
+
+    def test_index(self):
+        local.Local(self.tmp.name, shard_depth = 1).store("existing", b"")
+        backend = local.Local(self.tmp.name, shard_depth = 1, index = True)
+        backend.store("new", b"")
+        backend.store("new", b"")
+        self.assertEqual(sorted(backend.keys()), ["existing", "new"])
+        with mock.patch("os.walk", side_effect = AssertionError("scanned")):
+            self.assertEqual(sorted(backend.keys()), ["existing", "new"])
+
+    def test_index_in_new_root(self):
+        backend = local.Local(os.path.join(self.tmp.name, "a", "b"), index = True)
+        backend.store("key", b"")
+        self.assertEqual(backend.keys(), ["key"])
+
+    def test_index_store_many(self):
+        backend = local.Local(self.tmp.name, index = True)
+        backend.store_many({"a": b"1", "b/c": b"2"})
+        with mock.patch("os.walk", side_effect = AssertionError("scanned")):
+            self.assertEqual(sorted(backend.keys()), ["a", "b/c"])
+        self.assertEqual(backend.retrieve("b/c"), b"2")
@@ -0,0 +1,104 @@
+import time
+import pickle
+import unittest
+from views_storage.key_value_store import KeyValueStore
+from views_storage.backends import dictionary
+from views_storage.backends.retrying import Retrying, RetryPolicy
+from views_storage.serializers import pickle as pickle_serializer
+
+class FlakyBackend(dictionary.DictBackend):
+    """
+    Fails the first `failures` calls to each operation, or hangs for `hang`
+    seconds on them.
+    """
+    def __init__(self, failures: int = 0, hang: float = 0):
+        super().__init__()
+        self.failures = failures
+        self.hang = hang
+        self.calls = {}
+
+    def _flake(self, operation: str):
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.calls[operation] <= self.failures:
+            if self.hang:
+                time.sleep(self.hang)
+            else:
+                raise ConnectionError("Connection reset")
+
+    def store(self, key, value):
+        self._flake("store")
+        super().store(key, value)
+
+    def retrieve(self, key):
+        self._flake("retrieve")
+        return super().retrieve(key)
+
+    def delete(self, key):
+        super().delete(key)
+        self._flake("delete")
+
+    def is_retryable(self, error):
+        return isinstance(error, ConnectionError)
+
+FAST = dict(initial_backoff = 0.001, max_backoff = 0.01)
+
+class TestRetrying(unittest.TestCase):
+    def test_retries_transient_errors(self):
+        backend = FlakyBackend(failures = 2)
+        kv = KeyValueStore(backend = Retrying(backend, RetryPolicy(**FAST)), serializer = pickle_serializer.Pickle())
+        kv.write("key", "value")
+        self.assertEqual(kv.read("key"), "value")
+        self.assertEqual(backend.calls, {"store": 3, "retrieve": 3})
+
+    def test_gives_up(self):
+        backend = Retrying(FlakyBackend(failures = 5), RetryPolicy(attempts = 3, **FAST))
+        self.assertRaises(ConnectionError, lambda: backend.store("key", b""))
+        self.assertEqual(backend.backend.calls["store"], 3)
+
+        backend = Retrying(FlakyBackend(failures = 1), RetryPolicy(retry_writes = False, **FAST))
+        self.assertRaises(ConnectionError, lambda: backend.store("key", b""))
+
+    def test_does_not_retry_permanent_errors(self):
+        backend = Retrying(FlakyBackend(), RetryPolicy(**FAST))
+        self.assertRaises(KeyError, lambda: backend.retrieve("nonexistent"))
+        self.assertEqual(backend.backend.calls["retrieve"], 1)
+
+    def test_delete_is_idempotent(self):
+        backend = Retrying(FlakyBackend(failures = 1), RetryPolicy(**FAST))
+        backend.backend._dict["key"] = b""
+        backend.delete("key")
+        self.assertFalse(backend.exists("key"))
+
+    def test_timeout_and_deadline(self):
+        backend = Retrying(FlakyBackend(failures = 1, hang = 1), RetryPolicy(timeout = 0.1, **FAST))
+        backend.backend._dict["key"] = b"value"
+        self.assertEqual(backend.retrieve("key"), b"value")
+        self.assertEqual(backend.backend.calls["retrieve"], 2)
+
+        backend = Retrying(FlakyBackend(failures = 10, hang = 1), RetryPolicy(timeout = 0.1, deadline = 0.35, **FAST))
+        start = time.monotonic()
+        self.assertRaises(TimeoutError, lambda: backend.retrieve("key"))
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_abandoned_write_cannot_land_late(self):
+        backend = Retrying(FlakyBackend(failures = 1, hang = 0.3), RetryPolicy(timeout = 0.1, **FAST))
+        self.assertRaises(TimeoutError, lambda: backend.store("key", b"v1"))
+        self.assertEqual(backend.backend.calls["store"], 1)
+
+        backend.policy.timeout = 1
+        backend.store("key", b"v2")
+        time.sleep(0.3)
+        self.assertEqual(backend.retrieve("key"), b"v2")
+        self.assertEqual(backend._abandoned, {})
+
+        backend = Retrying(FlakyBackend(failures = 1, hang = 1), RetryPolicy(timeout = 0.1, **FAST))
+        self.assertRaises(TimeoutError, lambda: backend.store("key", b"v1"))
+        self.assertRaises(TimeoutError, lambda: backend.store("key", b"v2"))
+        self.assertEqual(backend.backend.calls["store"], 1)
+        backend.store("other", b"v")
+
+    def test_pickle(self):
+        backend = pickle.loads(pickle.dumps(Retrying(dictionary.DictBackend(), RetryPolicy(timeout = 1))))
+        backend.store("key", b"value")
+        self.assertEqual(backend.retrieve("key"), b"value")
+        self.assertEqual(backend.policy.timeout, 1)
@@ -3,7 +3,7 @@ import string
 import numpy as np
 import pandas as pd
 from pandas.testing import assert_frame_equal
-from views_storage.serializers import csv, parquet, pickle, serializer, json
+from views_storage.serializers import csv, parquet, pickle, serializer, json, dispatch
 
 class TestSerializers(unittest.TestCase):
     def assert_serializer_identity(self, dataframe, ser: serializer.Serializer):
@@ -27,3 +27,32 @@ class TestSerializers(unittest.TestCase):
                 "z": {"foo": 5.5}
                 }
         self.assertEqual(d, ser.deserialize(ser.serialize(d)))
+
+    def test_dispatch(self):
+        ser = dispatch.Dispatch()
+        df = pd.DataFrame(np.random.rand(10,10), columns = list(string.ascii_lowercase[:10]))
+        values = {
+                dispatch.PARQUET: df,
+                dispatch.NUMPY: np.asfortranarray(np.random.rand(3, 4)),
+                dispatch.JSON: {"a": [1, 2.5, None, {"b": True}]},
+                dispatch.PICKLE: {"a": (1, 2), 3: np.float64(1)},
+            }
+        for tag, value in values.items():
+            data = ser.serialize(value)
+            self.assertEqual(data[:4], dispatch.MAGIC + tag)
+            restored = ser.deserialize(data)
+            if tag == dispatch.PARQUET:
+                assert_frame_equal(restored, value)
+            elif tag == dispatch.NUMPY:
+                np.testing.assert_array_equal(restored, value)
+            else:
+                self.assertEqual(restored, value)
+
+        unnamed = pd.DataFrame(np.random.rand(3, 2))
+        self.assertEqual(ser.serialize(unnamed)[3:4], dispatch.PICKLE)
+        assert_frame_equal(ser.deserialize(ser.serialize(unnamed)), unnamed)
+        self.assertEqual(ser.serialize(np.array(["a", None], dtype = object))[3:4], dispatch.PICKLE)
+
+        assert_frame_equal(ser.deserialize(parquet.Parquet().serialize(df)), df)
+        assert_frame_equal(ser.deserialize(pickle.Pickle().serialize(df)), df)
+        assert_frame_equal(ser.deserialize(pickle.Pickle(compression = False).serialize(df)), df)
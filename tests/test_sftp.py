@@ -0,0 +1,211 @@
+"""
+Tests for the Sftp backend against an in-process SFTP server. The key
+database is replaced by an in-memory SQLite stand-in.
+"""
+import os
+import time
+import socket
+import pickle
+import unittest
+import tempfile
+import multiprocessing
+from unittest import mock
+import paramiko
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from views_storage.key_value_store import KeyValueStore
+from views_storage.backends import sftp
+from views_storage.sftp_storage import SftpStorage
+from views_storage.serializers import pickle as pickle_serializer
+from tests.stand_ins import key_db
+from tests.stand_ins.sftp import SftpServer
+from tests.stand_ins.latency import Link
+
+def connect(server: SftpServer, **kwargs) -> sftp.Sftp:
+    return sftp.Sftp(
+            host = server.host,
+            port = server.port,
+            user = "testuser",
+            key_db_host = "localhost",
+            key_db_dbname = "keys",
+            key_db_user = "testuser",
+            **kwargs)
+
+def read_in_worker(store: KeyValueStore, key: str):
+    return os.getpid(), id(store.backend.connection), store.read(key)
+
+class TestSftp(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = SftpServer(self.tmp.name).start()
+        patcher = key_db.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        small = b"abc"
+        large = os.urandom(2 ** 21 + 17)
+        for options in ({}, {"pipelined": False, "prefetch": False}, {"max_concurrent_requests": None}):
+            backend = connect(self.server, folder = "data", **options)
+            backend.store("small", small)
+            backend.store("large", large)
+            self.assertEqual(backend.retrieve("small"), small)
+            self.assertEqual(backend.retrieve("large"), large)
+            self.assertTrue(backend.exists("large"))
+            self.assertEqual(sorted(backend.keys().files), ["large", "small"])
+
+    def test_empty(self):
+        backend = connect(self.server)
+        backend.store("empty", b"")
+        self.assertEqual(backend.retrieve("empty"), b"")
+
+    def test_threads(self):
+        backend = connect(self.server)
+        values = {str(i): os.urandom(50000) for i in range(32)}
+
+        def round_trip(key):
+            backend.store(key, values[key])
+            return backend.retrieve(key), id(backend.connection)
+
+        with ThreadPoolExecutor(8) as pool:
+            results = dict(zip(values, pool.map(round_trip, values)))
+
+        self.assertEqual({k: v for k, (v, _) in results.items()}, values)
+        self.assertGreater(len({c for _, c in results.values()}), 1)
+
+    def test_processes(self):
+        store = KeyValueStore(backend = connect(self.server), serializer = pickle_serializer.Pickle())
+        store.write("key", "value")
+        self.assertIn(b"key", pickle.dumps(store))
+        with ProcessPoolExecutor(2, mp_context = multiprocessing.get_context("fork")) as pool:
+            results = list(pool.map(read_in_worker, [store] * 8, ["key"] * 8))
+
+        self.assertEqual({v for *_, v in results}, {"value"})
+        connections_per_worker = {}
+        for pid, connection, _ in results:
+            connections_per_worker.setdefault(pid, set()).add(connection)
+        self.assertTrue(all(len(c) == 1 for c in connections_per_worker.values()))
+
+    def test_info(self):
+        store = KeyValueStore(backend = connect(self.server), serializer = pickle_serializer.Pickle())
+        store.write("key", "value")
+        self.assertEqual(store.info("key")["type"], "str")
+        self.assertEqual(store.list().files, ["key"])
+        self.assertRaises(KeyError, lambda: store.info("nonexistent"))
+        self.assertEqual(store.backend.size("key"), store.info("key")["size"])
+        self.assertEqual(store.verify(deep = True), {"key": True})
+
+    def test_mixed_storage(self):
+        store = SftpStorage(
+                self.server.host, user = "keyuser", folder = "data",
+                sftp_port = self.server.port, sftp_user = "testuser")
+        self.assertEqual(store.backend._sftp_user, "testuser")
+        self.assertIn("user=keyuser", store.backend._keystore_connection_string)
+        df = pd.DataFrame({"a": [1.0, 2.0]})
+        store.write("df", df)
+        store.write("array", np.arange(4))
+        store.write("model", {"weights": (1, 2)})
+        pd.testing.assert_frame_equal(store.read("df"), df)
+        np.testing.assert_array_equal(store.read("array"), np.arange(4))
+        self.assertEqual(store.read("model"), {"weights": (1, 2)})
+        self.assertEqual(sorted(store.list().files), ["array", "df", "model"])
+
+    def test_versioned(self):
+        store = KeyValueStore(
+                backend = connect(self.server, folder = "data"),
+                serializer = pickle_serializer.Pickle(),
+                versioned = True,
+                keep_versions = 1)
+        store.write("a/b", 1)
+        store.write("a/b", 2, overwrite = True)
+        self.assertEqual(store.read("a/b"), 2)
+        self.assertEqual(store.read("a/b", version = 2), 2)
+        self.assertRaises(KeyError, lambda: store.read("a/b", version = 1))
+        self.assertEqual(store.list().folders, ["a"])
+
+        storage = SftpStorage(
+                self.server.host, user = "keyuser", folder = "data",
+                sftp_port = self.server.port, sftp_user = "testuser")
+        self.assertEqual(storage.list().folders, ["a"])
+
+    def test_retryable(self):
+        backend = connect(self.server, timeout = 5)
+        self.assertTrue(backend.is_retryable(socket.timeout()))
+        self.assertTrue(backend.is_retryable(paramiko.SSHException()))
+        self.assertFalse(backend.is_retryable(FileNotFoundError()))
+
+    def test_reconnect(self):
+        backend = connect(self.server)
+        backend.store("key", b"value")
+        backend.connection.close()
+        self.assertEqual(backend.retrieve("key"), b"value")
+
+    def test_link(self):
+        link = Link(latency = .02, bandwidth = 2 ** 23)
+        with SftpServer(self.tmp.name, link = link) as server:
+            backend = connect(server)
+            data = os.urandom(2 ** 20)
+            start = time.perf_counter()
+            backend.store("key", data)
+            written = time.perf_counter()
+            self.assertEqual(backend.retrieve("key"), data)
+            read = time.perf_counter()
+            self.assertGreaterEqual(written - start, link.round_trip(sent = len(data)))
+            self.assertGreaterEqual(read - written, link.round_trip(received = len(data)))
+            backend.close()
+
+    @unittest.skipUnless(os.environ.get("VIEWS_STORAGE_BENCHMARK"), "Set VIEWS_STORAGE_BENCHMARK to run benchmarks")
+    def test_throughput(self):
+        configurations = {
+                "paramiko defaults": {
+                    "pipelined": False, "prefetch": False,
+                    "window_size": 2 ** 21, "max_packet_size": 2 ** 15},
+                "tuned": {},
+            }
+        links = {
+                "loopback": (None, 2 ** 26),
+                "10 ms, 100 MB/s": (Link(latency = .01, bandwidth = 100 * 2 ** 20), 2 ** 22),
+            }
+        for link_name, (link, size) in links.items():
+            data = os.urandom(size)
+            with SftpServer(self.tmp.name, link = link) as server:
+                for name, options in configurations.items():
+                    backend = connect(server, **options)
+                    start = time.perf_counter()
+                    backend.store("bench", data)
+                    written = time.perf_counter()
+                    self.assertEqual(backend.retrieve("bench"), data)
+                    read = time.perf_counter()
+                    backend.close()
+                    mb = len(data) / 2 ** 20
+                    print(f"\n{link_name}, {name}: write {mb / (written - start):.1f} MB/s, read {mb / (read - written):.1f} MB/s")
+
+    def test_atomic_overwrite(self):
+        backend = connect(self.server)
+        backend.store("key", b"old")
+        backend.store("key", b"new")
+        self.assertEqual(backend.retrieve("key"), b"new")
+        self.assertEqual(os.listdir(self.tmp.name), ["key"])
+
+    def test_rename_fallback(self):
+        backend = connect(self.server)
+        backend.store("key", b"old")
+        with mock.patch.object(backend.connection, "posix_rename", side_effect = IOError("Operation unsupported")):
+            backend.store("key", b"new")
+        self.assertEqual(backend.retrieve("key"), b"new")
+        self.assertEqual(os.listdir(self.tmp.name), ["key"])
+
+    def test_rename_failure(self):
+        backend = connect(self.server)
+        backend.store("key", b"old")
+        with mock.patch.object(backend.connection, "posix_rename", side_effect = IOError("Failure")):
+            self.assertRaises(IOError, lambda: backend.store("key", b"new"))
+        backend.store("key", b"newer")
+        self.assertTrue(backend._posix_rename)
+        self.assertEqual(backend.retrieve("key"), b"newer")
+        self.assertEqual(os.listdir(self.tmp.name), ["key"])
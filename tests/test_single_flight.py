@@ -0,0 +1,79 @@
+import time
+import pickle
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from views_storage.key_value_store import KeyValueStore
+from views_storage.single_flight import SingleFlight
+from views_storage.backends import dictionary
+from views_storage.serializers import pickle as pickle_serializer
+
+class SlowBackend(dictionary.DictBackend):
+    def __init__(self):
+        super().__init__()
+        self.retrieved = 0
+
+    def retrieve(self, key: str) -> bytes:
+        self.retrieved += 1
+        time.sleep(.2)
+        return super().retrieve(key)
+
+class TestSingleFlight(unittest.TestCase):
+    def test_coalesced_reads(self):
+        backend = SlowBackend()
+        kv = KeyValueStore(backend = backend, serializer = pickle_serializer.Pickle(), single_flight = True)
+        kv.write("key", [1, 2, 3])
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(kv.read, ["key"] * 8))
+        self.assertEqual(backend.retrieved, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+
+        with ThreadPoolExecutor(8) as pool:
+            errors = [f.exception() for f in [pool.submit(kv.read, "nonexistent") for _ in range(8)]]
+        self.assertEqual(backend.retrieved, 2)
+        self.assertTrue(all(isinstance(e, KeyError) for e in errors))
+
+        kv.read("key")
+        self.assertEqual(backend.retrieved, 3)
+
+    def test_memoized_reads(self):
+        backend = SlowBackend()
+        kv = KeyValueStore(backend = backend, serializer = pickle_serializer.Pickle(), memoize_ttl = 60)
+        kv.write("key", "old")
+        self.assertEqual(kv.read("key"), "old")
+        self.assertEqual(kv.read("key"), "old")
+        self.assertEqual(backend.retrieved, 1)
+
+        kv.write("key", "new", overwrite = True)
+        self.assertEqual(kv.read("key"), "new")
+        self.assertEqual(backend.retrieved, 2)
+        self.assertIsNotNone(pickle.loads(pickle.dumps(kv))._flights)
+
+    def test_memo_bounded(self):
+        flights = SingleFlight(ttl = 60, max_entries = 2)
+        for key in "abc":
+            flights.do(key, lambda: key)
+        flights.do("b", lambda: "refetched")
+        self.assertEqual(list(flights._memo), ["c", "b"])
+        self.assertEqual(flights.do("a", lambda: "refetched"), "refetched")
+        self.assertEqual(list(flights._memo), ["b", "a"])
+        self.assertEqual(pickle.loads(pickle.dumps(flights))._max_entries, 2)
+
+    def test_forget_in_flight(self):
+        flights = SingleFlight(ttl = 60)
+        started, release = threading.Event(), threading.Event()
+
+        def stale():
+            started.set()
+            release.wait()
+            return "stale"
+
+        with ThreadPoolExecutor(1) as pool:
+            first = pool.submit(flights.do, "key", stale)
+            started.wait()
+            flights.forget("key")
+            self.assertEqual(flights.do("key", lambda: "fresh"), "fresh")
+            release.set()
+            self.assertEqual(first.result(), "stale")
+        self.assertEqual(flights.do("key", lambda: "other"), "fresh")
@@ -0,0 +1,46 @@
+import os
+import unittest
+import tempfile
+import multiprocessing
+from views_storage.key_value_store import KeyValueStore
+from views_storage.backends import sqlite
+from views_storage.serializers import json
+
+def write_range(path: str, start: int):
+    backend = sqlite.Sqlite(path)
+    backend.store_many({str(i): str(i).encode() for i in range(start, start + 100)})
+
+class TestSqliteBackend(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "store.sqlite3")
+        self.backend = sqlite.Sqlite(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_crud(self):
+        self.backend.store("a", b"1")
+        self.backend.store("a", b"2")
+        self.assertEqual(self.backend.retrieve("a"), b"2")
+        self.assertTrue(self.backend.exists("a"))
+        self.assertFalse(self.backend.exists("b"))
+        self.assertEqual(self.backend.keys(), ["a"])
+        self.assertRaises(KeyError, lambda: self.backend.retrieve("b"))
+
+    def test_many(self):
+        items = {str(i): os.urandom(10) for i in range(2500)}
+        self.backend.store_many(items)
+        self.assertEqual(self.backend.retrieve_many(items.keys()), items)
+        self.assertRaises(KeyError, lambda: self.backend.retrieve_many(["1", "nonexistent"]))
+
+    def test_processes(self):
+        with multiprocessing.get_context("spawn").Pool(4) as pool:
+            pool.starmap(write_range, [(self.path, start) for start in range(0, 400, 100)])
+        self.assertEqual(len(self.backend.keys()), 400)
+
+    def test_key_value_store(self):
+        kv = KeyValueStore(backend = self.backend, serializer = json.Json())
+        kv.write_many({"a": {"x": 1}, "b": [1, 2]})
+        self.assertEqual(kv.read_many(["a", "b"]), {"a": {"x": 1}, "b": [1, 2]})
+        self.assertRaises(FileExistsError, lambda: kv.write_many({"a": 1}))
@@ -1 +1 @@
-from .sftp_storage import SftpDataStorage, SftpObjectStorage
+from .sftp_storage import SftpStorage, SftpDataStorage, SftpObjectStorage
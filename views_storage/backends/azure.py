@@ -1,13 +1,53 @@
 
-from typing import List
-from azure.storage.blob import BlobServiceClient
-from . import storage_backend
+import json
+from typing import Dict, List
+from azure.core.exceptions import (
+        ResourceNotFoundError, ServiceRequestError, ServiceResponseError, HttpResponseError)
+from azure.storage.blob import BlobServiceClient, ContainerClient
+from views_storage import types
+from . import storage_backend, connections
 
 class AzureBlobStorageBackend(storage_backend.StorageBackend[str, bytes]):
+    """
+    AzureBlobStorageBackend
+    =======================
+
+    parameters:
+        connection_string (str)
+        container_name (str)
+
+    Backend that stores values as blobs in an Azure storage container.
+
+    Metadata is stored as blob metadata on the value blob. Records too large
+    for blob metadata (8 KiB) are stored in a separate blob below
+    ".metadata/", which is not listed by keys().
+
+    Container clients are created lazily for each process and thread (see
+    backends.connections), so an instance can be shared between threads,
+    survives forking, and pickles as its configuration.
+    """
+
+    METADATA_FIELD = "views_storage"
+    METADATA_PREFIX = ".metadata/"
+    _METADATA_LIMIT = 7 * 1024
+    _METADATA_IN_BLOB = "blob"
+    _RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+
     def __init__(self, connection_string: str, container_name: str):
-        self._container_client = (BlobServiceClient
-                .from_connection_string(connection_string)
-                .get_container_client(container_name))
+        self._connection_string = connection_string
+        self._container_name = container_name
+
+    @property
+    def _container_client(self) -> ContainerClient:
+        return connections.get(
+                self._connection_key,
+                self._connect,
+                close = lambda c: c.close())
+
+    def _connect(self) -> ContainerClient:
+        return (BlobServiceClient
+                .from_connection_string(self._connection_string)
+                .get_container_client(self._container_name))
 
     def _blob_client(self, name: str):
         return self._container_client.get_blob_client(name)
@@ -46,6 +86,64 @@ class AzureBlobStorageBackend(storage_backend.StorageBackend[str, bytes]):
         else:
             raise KeyError(f"{key} does not exist")
 
+    def size(self, key: str) -> int:
+        """
+        size
+        ====
+
+        parameters:
+            key (str)
+
+        returns:
+            int
+
+        Size of a blob, from its properties, without downloading it.
+        """
+        try:
+            return self._blob_client(key).get_blob_properties().size
+        except ResourceNotFoundError:
+            raise KeyError(f"{key} does not exist")
+
+    def store_metadata(self, key: str, metadata: Dict[str, types.JsonSerializable]) -> None:
+        """
+        store_metadata
+        ==============
+
+        parameters:
+            key (str)
+            metadata (Dict[str, JsonSerializable])
+
+        Stores metadata as blob metadata of the blob at key.
+        """
+        record = json.dumps(metadata)
+        if len(record) > self._METADATA_LIMIT:
+            self._blob_client(self.METADATA_PREFIX + key).upload_blob(record.encode(), overwrite = True)
+            record = self._METADATA_IN_BLOB
+        self._blob_client(key).set_blob_metadata({self.METADATA_FIELD: record})
+
+    def retrieve_metadata(self, key: str) -> Dict[str, types.JsonSerializable]:
+        """
+        retrieve_metadata
+        =================
+
+        parameters:
+            key (str)
+
+        returns:
+            Dict[str, JsonSerializable]
+
+        Fetches the metadata of a blob, without downloading it.
+        """
+        try:
+            record = self._blob_client(key).get_blob_properties().metadata.get(self.METADATA_FIELD)
+        except ResourceNotFoundError:
+            record = None
+        if record is None:
+            raise KeyError(f"No metadata for {key}")
+        if record == self._METADATA_IN_BLOB:
+            record = self._blob_client(self.METADATA_PREFIX + key).download_blob().readall()
+        return json.loads(record)
+
     def exists(self, key: str) -> bool:
         """
         exists
@@ -61,6 +159,26 @@ class AzureBlobStorageBackend(storage_backend.StorageBackend[str, bytes]):
         """
         return self._blob_client(key).exists()
 
+    def delete(self, key: str) -> None:
+        """
+        delete
+        ======
+
+        parameters:
+            key (str)
+
+        Deletes a blob, along with any separately stored metadata.
+        """
+        try:
+            self._blob_client(key).delete_blob()
+        except ResourceNotFoundError:
+            raise KeyError(f"{key} does not exist")
+
+        try:
+            self._blob_client(self.METADATA_PREFIX + key).delete_blob()
+        except ResourceNotFoundError:
+            pass
+
     def keys(self) -> List[str]:
         """
         keys
@@ -71,7 +189,25 @@ class AzureBlobStorageBackend(storage_backend.StorageBackend[str, bytes]):
 
         Returns the names of all of the blobs currently stored.
         """
-        return [blob.name for blob in self._container_client.list_blobs()]
+        return [
+                blob.name for blob in self._container_client.list_blobs()
+                if not blob.name.startswith(self.METADATA_PREFIX)]
+
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Failures to send requests or receive responses, throttling and
+        server errors are transient.
+        """
+        if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+            return True
+        return isinstance(error, HttpResponseError) and error.status_code in self._RETRYABLE_STATUS
+
+    def close(self) -> None:
+        """
+        Close the clients opened for this configuration in this process.
+        """
+        connections.close(self._connection_key)
 
-    def __del__(self):
-        self._container_client.close()
+    @property
+    def _connection_key(self):
+        return ("azure", self._connection_string, self._container_name)
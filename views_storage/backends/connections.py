@@ -0,0 +1,133 @@
+"""
+connections
+===========
+
+A registry of open connections, shared by all backend instances in a
+process. Connections are looked up by a key describing their configuration,
+so that backends can be pickled as plain configuration and still reuse the
+connection of an equally configured backend after being unpickled (for
+example in a multiprocessing worker running many tasks).
+
+Connections are created lazily, and separately for each thread unless
+per_thread is False. Per-thread connections are closed when their thread
+ends. A forked child starts with an empty registry, since
+connections inherited from the parent share its sockets and must neither be
+used nor closed by the child.
+"""
+import os
+import atexit
+import weakref
+import itertools
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+C = TypeVar("C")
+
+class _Entry():
+    def __init__(self, connection: Any, close: Optional[Callable[[Any], None]]):
+        self.connection = connection
+        self.close = close
+
+class _Thread():
+    """
+    Held in thread-local storage, which is dropped when the thread ends.
+    Thread idents are reused, so threads are told apart by a counter.
+    """
+    def __init__(self, number: int):
+        self.number = number
+
+_lock = threading.Lock()
+_entries: Dict[Tuple[Hashable, Optional[int]], _Entry] = {}
+_local = threading.local()
+_numbers = itertools.count()
+
+def _thread_number() -> int:
+    thread = getattr(_local, "thread", None)
+    if thread is None:
+        thread = _local.thread = _Thread(next(_numbers))
+        weakref.finalize(thread, _close_thread, thread.number)
+    return thread.number
+
+def get(
+        key: Hashable,
+        connect: Callable[[], C],
+        close: Optional[Callable[[C], None]] = None,
+        alive: Optional[Callable[[C], bool]] = None,
+        per_thread: bool = True) -> C:
+    """
+    get
+    ===
+
+    parameters:
+        key (Hashable): Identifies the configuration of the connection
+        connect (Callable[[], C]): Opens a new connection
+        close (Optional[Callable[[C], None]]): Closes a connection
+        alive (Optional[Callable[[C], bool]]): Whether a connection is still usable
+        per_thread (bool): Whether to keep one connection per thread = True
+
+    returns:
+        C
+
+    Returns the registered connection for key, opening it if there is none,
+    or if the existing one is no longer alive.
+    """
+    entry_key = (key, _thread_number() if per_thread else None)
+    with _lock:
+        entry = _entries.get(entry_key)
+
+    if entry is not None:
+        if alive is None or alive(entry.connection):
+            return entry.connection
+        _close(entry)
+
+    entry = _Entry(connect(), close)
+    with _lock:
+        _entries[entry_key] = entry
+    return entry.connection
+
+def close(key: Hashable) -> None:
+    """
+    close
+    =====
+
+    parameters:
+        key (Hashable)
+
+    Closes and forgets all connections registered for key in this process.
+    """
+    with _lock:
+        entries = [(k, e) for k, e in _entries.items() if k[0] == key]
+        for entry_key, _ in entries:
+            del _entries[entry_key]
+    for _, entry in entries:
+        _close(entry)
+
+def close_all() -> None:
+    with _lock:
+        entries = list(_entries.values())
+        _entries.clear()
+    for entry in entries:
+        _close(entry)
+
+def _close_thread(number: int) -> None:
+    with _lock:
+        entries = [(k, e) for k, e in _entries.items() if k[1] == number]
+        for entry_key, _ in entries:
+            del _entries[entry_key]
+    for _, entry in entries:
+        _close(entry)
+
+def _close(entry: _Entry) -> None:
+    if entry.close is not None:
+        try:
+            entry.close(entry.connection)
+        except Exception:
+            pass
+
+def _forget_after_fork() -> None:
+    global _lock
+    _lock = threading.Lock()
+    _entries.clear()
+
+os.register_at_fork(after_in_child = _forget_after_fork)
+atexit.register(close_all)
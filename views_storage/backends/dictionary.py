@@ -1,10 +1,13 @@
 
+from typing import Dict
+from views_storage import types
 from . import storage_backend
 
 
 class DictBackend(storage_backend.StorageBackend[str, bytes]):
     def __init__(self):
         self._dict = {}
+        self._metadata = {}
         super().__init__()
 
     def store(self, key: str, value: bytes) -> None:
@@ -18,3 +21,16 @@ class DictBackend(storage_backend.StorageBackend[str, bytes]):
 
     def keys(self):
         return list(self._dict.keys())
+
+    def delete(self, key: str) -> None:
+        del self._dict[key]
+        self._metadata.pop(key, None)
+
+    def size(self, key: str) -> int:
+        return len(self._dict[key])
+
+    def store_metadata(self, key: str, metadata: Dict[str, types.JsonSerializable]) -> None:
+        self._metadata[key] = metadata
+
+    def retrieve_metadata(self, key: str) -> Dict[str, types.JsonSerializable]:
+        return self._metadata[key]
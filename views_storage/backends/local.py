@@ -1,25 +1,221 @@
 
 import os
-from . import storage_backend
+import json
+import hashlib
+import sqlite3
+from typing import Dict, List, Set
+from views_storage import types
+from . import storage_backend, connections
 
 class Local(storage_backend.StorageBackend[str, bytes]):
+    """
+    Local
+    =====
+
+    parameters:
+        root (str): Folder in which to store files
+        atomic (bool): Write to a temporary file and rename it into place = True
+        fsync (bool): Flush written files to disk before renaming = False
+        shard_depth (int): Number of hash-prefix folder levels above each file = 0
+        shard_width (int): Number of hex characters in each hash-prefix folder = 2
+        index (bool): Keep a persistent index of keys in the root folder = False
+
+    Backend that stores files in a local (or mounted) folder. With atomic
+    writes, concurrent readers see either the previous or the new contents of
+    a file, never a partially written one.
+
+    Keys may contain "/", in which case intermediate folders are created. With
+    sharding, a key is stored below folders named after the leading
+    characters of its SHA1 hash (i.e. key "a/b" with depth 2 is stored at
+    "7f/30/a/b"), which keeps folders small when there are many keys.
+
+    With an index, keys() is answered from a SQLite file in the root folder
+    instead of walking the whole tree. The index is built from the existing
+    files when first created, and only tracks writes made through a Local
+    with the index enabled. Every write then also updates the index, which
+    serializes concurrent writers on its lock (use store_many to update it
+    once for many files). SQLite locking is unreliable on network
+    filesystems (i.e. NFS), so the index should only be used on local
+    disks.
+
+    Metadata is stored in a hidden JSON file next to each file. Names starting
+    with "." are reserved for temporary, metadata and index files, and are
+    not listed by keys().
+    """
+
+    INDEX_FILE = ".keys.sqlite3"
 
     def store(self, key: str, value: bytes) -> None:
-        with open(self._path(key), "wb") as f:
-            f.write(value)
+        self.store_many({key: value})
+
+    def store_many(self, items: Dict[str, bytes]) -> None:
+        """
+        store_many
+        ==========
+
+        parameters:
+            items (Dict[str, bytes])
+
+        Stores several files. With an index, the keys are added to it in a
+        single transaction after all files are written.
+        """
+        for key, value in items.items():
+            path = self._path(key)
+            self._make_parents(path)
+            if not self._atomic:
+                with open(path, "wb") as f:
+                    f.write(value)
+            else:
+                self._store_atomic(path, value)
+
+        if self._index:
+            with self._index_connection() as con:
+                con.executemany("insert or ignore into keys (key) values (?)", ((k,) for k in items))
 
     def retrieve(self, key: str):
-        with open(self._path(key), "rb") as f:
-            return f.read()
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(f"{key} does not exist")
+
+    def size(self, key: str) -> int:
+        try:
+            return os.stat(self._path(key)).st_size
+        except FileNotFoundError:
+            raise KeyError(f"{key} does not exist")
 
-    def keys(self):
-        return os.listdir(self._root)
+    def store_metadata(self, key: str, metadata: Dict[str, types.JsonSerializable]) -> None:
+        path = storage_backend.metadata_path(self._path(key))
+        self._make_parents(path)
+        self._store_atomic(path, json.dumps(metadata).encode())
+
+    def retrieve_metadata(self, key: str) -> Dict[str, types.JsonSerializable]:
+        try:
+            with open(storage_backend.metadata_path(self._path(key)), "rb") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(f"No metadata for {key}")
+
+    def keys(self) -> List[str]:
+        if self._index:
+            return [k for k, in self._index_connection().execute("select key from keys")]
+        return self._scan()
 
     def exists(self, key: str):
         return os.path.exists(self._path(key))
 
-    def __init__(self, root: str):
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            raise KeyError(f"{key} does not exist")
+
+        try:
+            os.remove(storage_backend.metadata_path(path))
+        except FileNotFoundError:
+            pass
+
+        if self._index:
+            with self._index_connection() as con:
+                con.execute("delete from keys where key = ?", (key,))
+
+    def rebuild_index(self) -> None:
+        """
+        rebuild_index
+        =============
+
+        Replace the contents of the key index with the files currently found
+        in the root folder.
+        """
+        keys = self._scan()
+        with self._index_connection() as con:
+            con.execute("delete from keys")
+            con.executemany("insert into keys (key) values (?)", ((k,) for k in keys))
+
+    def __init__(self,
+            root: str,
+            atomic: bool = True,
+            fsync: bool = False,
+            shard_depth: int = 0,
+            shard_width: int = 2,
+            index: bool = False):
         self._root = root
+        self._atomic = atomic
+        self._fsync = fsync
+        self._shard_depth = shard_depth
+        self._shard_width = shard_width
+        self._index = index
+        self._existing_folders: Set[str] = set()
+
+        if self._index:
+            os.makedirs(self._root, exist_ok = True)
+            self._setup_index()
 
     def _path(self, key: str):
-        return os.path.join(self._root, key)
+        return os.path.join(self._root, *self._shards(key), key)
+
+    def _shards(self, key: str) -> List[str]:
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        width = self._shard_width
+        return [digest[i * width: (i + 1) * width] for i in range(self._shard_depth)]
+
+    def _scan(self) -> List[str]:
+        keys = []
+        for folder, folders, files in os.walk(self._root):
+            folders[:] = [f for f in folders if not f.startswith(".")]
+            parts = os.path.relpath(folder, self._root).split(os.sep)[self._shard_depth:]
+            parts = [p for p in parts if p != "."]
+            for name in files:
+                if name.startswith("."):
+                    continue
+                keys.append("/".join(parts + [name]))
+        return keys
+
+    def _make_parents(self, path: str):
+        folder = os.path.dirname(path)
+        if folder not in self._existing_folders:
+            os.makedirs(folder, exist_ok = True)
+            self._existing_folders.add(folder)
+
+    def _store_atomic(self, path: str, value: bytes):
+        temporary = storage_backend.temporary_path(path)
+        try:
+            with open(temporary, "xb") as f:
+                f.write(value)
+                if self._fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+        if self._fsync:
+            self._fsync_dir(os.path.dirname(path))
+
+    def _index_connection(self) -> sqlite3.Connection:
+        path = os.path.abspath(os.path.join(self._root, self.INDEX_FILE))
+        return connections.get(
+                ("local-index", path),
+                lambda: sqlite3.connect(path, timeout = 30),
+                close = lambda c: c.close())
+
+    def _setup_index(self):
+        with self._index_connection() as con:
+            created = con.execute(
+                    "select count(*) from sqlite_master where type = 'table' and name = 'keys'"
+                ).fetchone()[0] == 0
+            con.execute("create table if not exists keys (key text primary key) without rowid")
+        if created:
+            self.rebuild_index()
+
+    @staticmethod
+    def _fsync_dir(path: str):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,239 @@
+
+import os
+import time
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait as wait_for
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, TypeVar
+from views_storage import types
+from . import storage_backend
+
+R = TypeVar("R")
+
+class RetryPolicy():
+    """
+    RetryPolicy
+    ===========
+
+    parameters:
+        attempts (int): Max. number of attempts per operation = 5
+        initial_backoff (float): Max. seconds to wait before the first retry = 0.5
+        max_backoff (float): Upper limit on the wait between attempts = 30
+        multiplier (float): Growth of the wait limit with each attempt = 2
+        timeout (Optional[float]): Seconds allowed for each attempt = None
+        deadline (Optional[float]): Seconds allowed for all attempts of an operation = None
+        retry_writes (bool): Whether to retry operations that modify data = True
+
+    Exponential backoff with full jitter: before retry n, a random time
+    between 0 and min(max_backoff, initial_backoff * multiplier ** n) is
+    waited.
+    """
+
+    def __init__(self,
+            attempts: int = 5,
+            initial_backoff: float = 0.5,
+            max_backoff: float = 30,
+            multiplier: float = 2,
+            timeout: Optional[float] = None,
+            deadline: Optional[float] = None,
+            retry_writes: bool = True):
+        self.attempts = attempts
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retry_writes = retry_writes
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.initial_backoff * self.multiplier ** attempt))
+
+class _Abandoned(TimeoutError):
+    """
+    An attempt was abandoned, and may still be running.
+    """
+
+class Retrying(storage_backend.StorageBackend):
+    """
+    Retrying
+    ========
+
+    parameters:
+        backend (views_storage.backends.storage_backend.StorageBackend)
+        policy (Optional[RetryPolicy]): = RetryPolicy()
+        max_workers (int): Threads running attempts when a timeout is set = 16
+
+    Wraps a backend, retrying its operations when they fail with errors
+    that the backend classifies as transient (see
+    StorageBackend.is_retryable).
+
+    All writes offered by StorageBackend replace or remove whole values, and
+    can be repeated safely. They are retried unless the policy says
+    otherwise. A delete that fails with KeyError after an earlier attempt
+    was cut off is taken to have succeeded.
+
+    With a timeout, attempts run on a pool of worker threads and are
+    abandoned when they run out of time, which counts as a transient error.
+    Since backends keep a connection per thread, the next attempt runs on
+    another thread with its own connection. An abandoned attempt keeps its
+    worker thread until it returns, so the backends should also have
+    timeouts of their own (i.e. Sftp's timeout) where available.
+
+    An abandoned write may still land later, so a write that times out is
+    not retried, but fails with TimeoutError. Later writes of the same keys
+    through this wrapper wait (within their own timeout) for the abandoned
+    write to finish, so that it cannot overwrite them.
+
+    Other attributes of the backend are passed through without retrying.
+    """
+
+    def __init__(self,
+            backend: storage_backend.StorageBackend,
+            policy: Optional[RetryPolicy] = None,
+            max_workers: int = 16):
+        self.backend = backend
+        self.policy = policy if policy is not None else RetryPolicy()
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid = os.getpid()
+        self._executor_lock = threading.Lock()
+        self._abandoned: Dict[Any, Future] = {}
+
+    def store(self, key: Any, value: Any) -> None:
+        return self._call(self.backend.store, key, value, write = (key,))
+
+    def retrieve(self, key: Any) -> Any:
+        return self._call(self.backend.retrieve, key)
+
+    def exists(self, key: Any) -> bool:
+        return self._call(self.backend.exists, key)
+
+    def keys(self):
+        return self._call(self.backend.keys)
+
+    def delete(self, key: Any) -> None:
+        return self._call(self.backend.delete, key, write = (key,), missing_ok_on_retry = True)
+
+    def store_many(self, items: Dict[Any, Any]) -> None:
+        return self._call(self.backend.store_many, items, write = tuple(items))
+
+    def retrieve_many(self, keys: Iterable[Any]) -> Dict[Any, Any]:
+        return self._call(self.backend.retrieve_many, list(keys))
+
+    def size(self, key: Any) -> int:
+        return self._call(self.backend.size, key)
+
+    def size_many(self, keys: Iterable[Any]) -> Dict[Any, int]:
+        return self._call(self.backend.size_many, list(keys))
+
+    def store_metadata(self, key: Any, metadata: Dict[str, types.JsonSerializable]) -> None:
+        return self._call(self.backend.store_metadata, key, metadata, write = (key,))
+
+    def retrieve_metadata(self, key: Any) -> Dict[str, types.JsonSerializable]:
+        return self._call(self.backend.retrieve_metadata, key)
+
+    def store_metadata_many(self, items: Dict[Any, Dict[str, types.JsonSerializable]]) -> None:
+        return self._call(self.backend.store_metadata_many, items, write = tuple(items))
+
+    def retrieve_metadata_many(self,
+            keys: Iterable[Any],
+            skip_missing: bool = False) -> Dict[Any, Dict[str, types.JsonSerializable]]:
+        return self._call(self.backend.retrieve_metadata_many, list(keys), skip_missing)
+
+    def is_retryable(self, error: Exception) -> bool:
+        return isinstance(error, TimeoutError) or self.backend.is_retryable(error)
+
+    @property
+    def supports_metadata(self) -> bool:
+        return self.backend.supports_metadata
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or name == "backend":
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def __getstate__(self):
+        return {"backend": self.backend, "policy": self.policy, "max_workers": self._max_workers}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _call(self,
+            fn: Callable[..., R],
+            *args: Any,
+            write: Tuple[Any, ...] = (),
+            missing_ok_on_retry: bool = False) -> R:
+        """
+        Runs fn with retries. For writes, write holds the keys written.
+        """
+        policy = self.policy
+        attempts = policy.attempts if policy.retry_writes or not write else 1
+        start = time.monotonic()
+
+        for attempt in range(attempts):
+            timeout = policy.timeout
+            if policy.deadline is not None:
+                remaining = policy.deadline - (time.monotonic() - start)
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            try:
+                return self._attempt(fn, args, timeout, write)
+            except KeyError:
+                if missing_ok_on_retry and attempt > 0:
+                    return None
+                raise
+            except Exception as error:
+                if attempt + 1 == attempts or not self.is_retryable(error):
+                    raise
+                if write and isinstance(error, _Abandoned):
+                    raise
+                wait = policy.backoff(attempt)
+                if policy.deadline is not None and time.monotonic() - start + wait >= policy.deadline:
+                    raise
+                time.sleep(wait)
+
+    def _attempt(self, fn: Callable[..., R], args: tuple, timeout: Optional[float], write: Tuple[Any, ...]) -> R:
+        started = time.monotonic()
+        self._check_fork()
+        with self._executor_lock:
+            earlier = {self._abandoned[k] for k in write if k in self._abandoned}
+        if earlier and wait_for(earlier, timeout = None if timeout is None else max(timeout, 0)).not_done:
+            raise _Abandoned(f"{fn.__name__} waited for an abandoned write of the same key")
+
+        if timeout is None:
+            return fn(*args)
+
+        timeout -= time.monotonic() - started
+        future = self._pool().submit(fn, *args)
+        try:
+            return future.result(timeout = max(timeout, 0))
+        except FutureTimeoutError:
+            if not future.cancel() and write:
+                self._fence(future, write)
+            raise _Abandoned(f"{fn.__name__} did not finish within the timeout")
+
+    def _fence(self, future: Future, keys: Tuple[Any, ...]) -> None:
+        with self._executor_lock:
+            for key in keys:
+                self._abandoned[key] = future
+
+        def release(_):
+            with self._executor_lock:
+                for key in keys:
+                    if self._abandoned.get(key) is future:
+                        del self._abandoned[key]
+
+        future.add_done_callback(release)
+
+    def _check_fork(self) -> None:
+        if self._executor_pid != os.getpid():
+            # The worker threads of the parent do not exist after a fork
+            self._executor, self._executor_pid = None, os.getpid()
+            self._executor_lock = threading.Lock()
+            self._abandoned = {}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        self._check_fork()
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self._max_workers, thread_name_prefix = "views-storage-retry")
+            return self._executor
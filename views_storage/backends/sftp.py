@@ -1,13 +1,15 @@
-from typing import Optional
+from typing import Dict, Optional
 from stat import S_ISDIR, S_ISREG
 import os
+import json
+import socket
 from tempfile import NamedTemporaryFile
 from cryptography import x509
 import paramiko
 import psycopg2
 import sqlalchemy as sa
-from .. import models
-from . import storage_backend
+from .. import models, types
+from . import storage_backend, connections
 
 
 class Sftp(storage_backend.StorageBackend[str, bytes]):
@@ -26,6 +28,14 @@ class Sftp(storage_backend.StorageBackend[str, bytes]):
         key_db_password (Optional[str]): Cert auth. if not provided
         key_db_port (int) = 5432
         folder (str):  Root folder on sftp server = "."
+        atomic (bool): Write to a temporary file and rename it into place = True
+        pipelined (bool): Pipeline write requests instead of waiting for each ack = True
+        prefetch (bool): Issue concurrent read requests for files above prefetch_threshold = True
+        prefetch_threshold (int): File size in bytes above which reads are prefetched = 32768
+        max_concurrent_requests (Optional[int]): Cap on outstanding read requests per file = 128
+        window_size (int): SSH channel window size in bytes = 32 MiB
+        max_packet_size (int): SSH channel max packet size in bytes = 32768
+        timeout (Optional[float]): Seconds to wait on the socket before failing = None
 
     Backend that stores and retrieves files via SFTP. Authentication is done
     via a database, which requires you to have a valid client certificate
@@ -33,8 +43,19 @@ class Sftp(storage_backend.StorageBackend[str, bytes]):
 
     If key database username is not provided, the username is attempted
     inferred from the database certificate at ~/.postgresql/postgresql.crt
+
+    Connections are opened lazily for each process and thread (see
+    backends.connections), so an instance can be shared between threads,
+    survives forking, and pickles as its configuration.
+
+    The transfer options exist for high-latency links, where the paramiko
+    defaults (one outstanding request at a time, 2 MiB window) leave most of
+    the available bandwidth unused.
     """
 
+    # Status text of SSH_FX_OP_UNSUPPORTED, as sent by OpenSSH and paramiko
+    _UNSUPPORTED = paramiko.sftp.SFTP_DESC[paramiko.sftp.SFTP_OP_UNSUPPORTED]
+
     def __init__(self,
             host: str,
             port: int,
@@ -45,7 +66,15 @@ class Sftp(storage_backend.StorageBackend[str, bytes]):
             key_db_sslmode: str = "require",
             key_db_password: Optional[str] = None,
             key_db_port: int = 5432,
-            folder: str = "."):
+            folder: str = ".",
+            atomic: bool = True,
+            pipelined: bool = True,
+            prefetch: bool = True,
+            prefetch_threshold: int = 32768,
+            max_concurrent_requests: Optional[int] = 128,
+            window_size: int = 2 ** 25,
+            max_packet_size: int = 32768,
+            timeout: Optional[float] = None):
 
         self._keystore_connection_string = (
             f"host={key_db_host} "
@@ -63,11 +92,20 @@ class Sftp(storage_backend.StorageBackend[str, bytes]):
         self._sftp_port = port
         self._sftp_user = user
 
-        self.key        = self._fetch_paramiko_key()
-        self.connection = self._connect()
+        self._atomic                  = atomic
+        self._posix_rename            = True
+        self._pipelined               = pipelined
+        self._prefetch                = prefetch
+        self._prefetch_threshold      = prefetch_threshold
+        self._max_concurrent_requests = max_concurrent_requests
+        self._window_size             = window_size
+        self._max_packet_size         = max_packet_size
+        self._timeout                 = timeout
+
         self._folder    = os.path.join("",folder)
 
         self.setup_dir(self._folder)
+        self._existing_folders = {self._folder}
 
     def store(self, key: str, value: bytes) -> None:
         """
@@ -78,12 +116,62 @@ class Sftp(storage_backend.StorageBackend[str, bytes]):
             key (str)
             value (bytes)
 
-        Store file in remote folder, at path specified by "key".
+        Store file in remote folder, at path specified by "key", creating
+        intermediate folders for keys containing "/". Writes are
+        pipelined if enabled, so the whole value is sent without waiting for
+        the server to acknowledge each chunk.
+
+        With atomic writes, the file is written under a temporary name and
+        moved into place with the posix-rename extension, so readers never
+        see a partial file. Servers without the extension fall back to
+        removing the old file before renaming, which is not atomic.
         """
-        path = self._path(key)
+        self._store_file(self._path(key), value)
+
+    def _store_file(self, path: str, value: bytes) -> None:
+        folder = os.path.dirname(path)
+        if folder not in self._existing_folders:
+            self.setup_dir(folder)
+            self._existing_folders.add(folder)
+
+        if not self._atomic:
+            self._write(path, value)
+            return
+
+        temporary = storage_backend.temporary_path(path)
+        try:
+            self._write(temporary, value)
+            self._rename(temporary, path)
+        except BaseException:
+            try:
+                self.connection.remove(temporary)
+            except IOError:
+                pass
+            raise
+
+    def _write(self, path: str, value: bytes) -> None:
         with self.connection.open(path, "wb") as f:
+            f.set_pipelined(self._pipelined)
             f.write(value)
 
+    def _rename(self, source: str, destination: str) -> None:
+        if self._posix_rename:
+            try:
+                self.connection.posix_rename(source, destination)
+                return
+            except IOError as e:
+                # Other failures (SSH_FX_FAILURE) are also reported without
+                # an errno, so only the status text tells them apart.
+                if e.errno is not None or str(e) != self._UNSUPPORTED:
+                    raise
+                self._posix_rename = False
+
+        try:
+            self.connection.remove(destination)
+        except IOError:
+            pass
+        self.connection.rename(source, destination)
+
     def retrieve(self, key: str) -> bytes:
         """
         retrieve
@@ -95,12 +183,73 @@ class Sftp(storage_backend.StorageBackend[str, bytes]):
         returns:
             bytes
 
-        Retrieve contents of file at path specified by "key".
+        Retrieve contents of file at path specified by "key". Files larger
+        than the prefetch threshold are read using many concurrent requests.
         """
-        path = self._path(key)
-        with self.connection.open(path, "rb") as f:
+        try:
+            f = self.connection.open(self._path(key), "rb")
+        except FileNotFoundError:
+            raise KeyError(f"{key} does not exist")
+
+        with f:
+            size = f.stat().st_size
+            if self._prefetch and size > self._prefetch_threshold:
+                f.prefetch(size, self._max_concurrent_requests)
+            # Sized reads grow an immutable buffer in paramiko, which is
+            # quadratic in the file size. Unsized reads use a bytearray.
             return f.read()
 
+    def size(self, key: str) -> int:
+        """
+        size
+        ====
+
+        parameters:
+            key (str)
+
+        returns:
+            int
+
+        Size of the file at "key", from a stat of the file.
+        """
+        try:
+            return self.connection.stat(self._path(key)).st_size
+        except FileNotFoundError:
+            raise KeyError(f"{key} does not exist")
+
+    def store_metadata(self, key: str, metadata: Dict[str, types.JsonSerializable]) -> None:
+        """
+        store_metadata
+        ==============
+
+        parameters:
+            key (str)
+            metadata (Dict[str, JsonSerializable])
+
+        Store metadata in a hidden JSON file next to the file at "key".
+        """
+        path = storage_backend.metadata_path(self._path(key))
+        self._store_file(path, json.dumps(metadata).encode())
+
+    def retrieve_metadata(self, key: str) -> Dict[str, types.JsonSerializable]:
+        """
+        retrieve_metadata
+        =================
+
+        parameters:
+            key (str)
+
+        returns:
+            Dict[str, JsonSerializable]
+
+        Retrieve the metadata stored for "key".
+        """
+        try:
+            with self.connection.open(storage_backend.metadata_path(self._path(key)), "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            raise KeyError(f"No metadata for {key}")
+
     def exists(self, key: str) -> bool:
         """
         exists
@@ -118,6 +267,27 @@ class Sftp(storage_backend.StorageBackend[str, bytes]):
         except IOError:
             return False
 
+    def delete(self, key: str) -> None:
+        """
+        delete
+        ======
+
+        parameters:
+            key (str)
+
+        Remove the file at "key" and its metadata.
+        """
+        path = self._path(key)
+        try:
+            self.connection.remove(path)
+        except FileNotFoundError:
+            raise KeyError(f"{key} does not exist")
+
+        try:
+            self.connection.remove(storage_backend.metadata_path(path))
+        except FileNotFoundError:
+            pass
+
     def list(self, key: str = ".") -> models.Listing:
         """
         list
@@ -129,13 +299,16 @@ class Sftp(storage_backend.StorageBackend[str, bytes]):
         returns:
             views_storage.models.Listing
 
-        List contents of folder at "key"
+        List contents of folder at "key". Folders and files with names
+        starting with "." are reserved for internal use, and not listed.
         """
         folders = []
         files = []
 
         for entry in self.connection.listdir_attr(self._path(key)):
             mode = entry.st_mode
+            if entry.filename.startswith("."):
+                continue
             if S_ISDIR(mode):
                 folders.append(entry.filename)
             elif S_ISREG(mode):
@@ -198,13 +371,26 @@ class Sftp(storage_backend.StorageBackend[str, bytes]):
         returns:
             paramiko.SFTPClient
 
-        Initialize a connection and connect to the sftp store.
-        The user and key are the dedicated user and key generated above.
+        Initialize a connection and connect to the sftp store. Nagle's
+        algorithm is disabled, since it holds back the small SFTP requests
+        while earlier ones are unacknowledged.
+        The user and key are the dedicated user and key generated above. The
+        key is fetched for each new connection, and not kept afterwards.
         DO NOT use your views user share!
         """
-        t = paramiko.Transport((self._sftp_host, self._sftp_port))
-        t.connect(hostkey=None, pkey=self.key, username=self._sftp_user)
-        return paramiko.SFTPClient.from_transport(t)
+        sock = socket.create_connection((self._sftp_host, self._sftp_port), timeout = self._timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        t = paramiko.Transport(
+                sock,
+                default_window_size = self._window_size,
+                default_max_packet_size = self._max_packet_size)
+        t.connect(hostkey=None, pkey=self._fetch_paramiko_key(), username=self._sftp_user)
+        client = paramiko.SFTPClient.from_transport(
+                t,
+                window_size = self._window_size,
+                max_packet_size = self._max_packet_size)
+        client.get_channel().settimeout(self._timeout)
+        return client
 
     @staticmethod
     def _file_name_fixer(file_name, extension):
@@ -221,16 +407,50 @@ class Sftp(storage_backend.StorageBackend[str, bytes]):
     def _path(self, key):
         return os.path.join(self._folder, key)
 
-    def __del__(self):
+    @property
+    def connection(self) -> paramiko.SFTPClient:
         """
-        Destruct the key and close the connection if it exists.
-        :return: Nothing, it's a destructor.
+        The connection of the current process and thread, opened on first use
+        and reopened if the transport has been closed. Equally configured
+        backends share connections.
         """
-        self.key = None
-        try:
-            self.connection.close()
-        except TypeError:
-            pass
+        return connections.get(
+                self._connection_key,
+                self._connect,
+                close = lambda c: c.close(),
+                alive = self._alive)
+
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Connection failures and timeouts are transient. Errors reported by
+        the server (i.e. missing files) are not.
+        """
+        return (
+                isinstance(error, (paramiko.SSHException, EOFError, ConnectionError, socket.timeout))
+                or (isinstance(error, OSError) and str(error) == "Socket is closed"))
+
+    @staticmethod
+    def _alive(connection: paramiko.SFTPClient) -> bool:
+        channel = connection.get_channel()
+        return not channel.closed and channel.get_transport().is_active()
+
+    def close(self) -> None:
+        """
+        Close the connections opened for this configuration in this process.
+        """
+        connections.close(self._connection_key)
+
+    @property
+    def _connection_key(self):
+        return (
+                "sftp",
+                self._sftp_host,
+                self._sftp_port,
+                self._sftp_user,
+                self._keystore_connection_string,
+                self._window_size,
+                self._max_packet_size,
+                self._timeout)
 
     @staticmethod
     def get_cert_username():
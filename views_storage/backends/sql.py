@@ -1,16 +1,85 @@
 
-from typing import Optional, Union, Dict
+import io
+import os
+import json
+import sqlite3
+from typing import Optional, Union, Dict, Iterable, Iterator
+import pandas as pd
 import sqlalchemy as sa
 from sqlalchemy.engine import Engine, Connection
 from views_storage import types
-from . import storage_backend
+from . import storage_backend, connections
 
 KeyType = Union[str, int]
 
+class _CsvStream(io.RawIOBase):
+    """
+    A file-like object producing a DataFrame as headerless CSV, serialized
+    one chunk of rows at a time as it is read. Missing values are written as
+    \\N, so that empty strings are not read as NULL by COPY.
+    """
+
+    NULL = "\\N"
+
+    def __init__(self, frame: pd.DataFrame, chunksize: int):
+        self._chunks: Iterator[bytes] = (
+                frame.iloc[i: i + chunksize].to_csv(header = False, index = False, na_rep = self.NULL).encode()
+                for i in range(0, len(frame), chunksize))
+        self._chunk = b""
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            return b"".join([self._chunk[self._offset:], *self._chunks])
+
+        while self._offset >= len(self._chunk):
+            try:
+                self._chunk, self._offset = next(self._chunks), 0
+            except StopIteration:
+                return b""
+        data = self._chunk[self._offset: self._offset + size]
+        self._offset += len(data)
+        return data
+
 class Sql(storage_backend.StorageBackend[KeyType, Dict[str, types.JsonSerializable]]):
+    """
+    Sql
+    ===
+
+    parameters:
+        engine (sqlalchemy.engine.Engine)
+        table_name (str): Table holding the values, with a single primary key column
+        schema (Optional[str])
+
+    Backend that stores dicts as rows of a database table. Metadata is
+    stored in a side table named "<table_name>_metadata", which is created
+    when metadata is first stored.
+
+    Many rows can be written and read at once as DataFrames, using
+    store_frame and read_frame.
+
+    After a fork, the engine's pool is replaced without closing the parent's
+    connections. When pickled, only the engine URL is kept, and the
+    unpickled backend uses an engine created from it, shared by all
+    backends with the same URL in the process. Other engine options are not
+    carried over.
+    """
+
+    # Bound parameters per IN-clause, kept below the limit of older SQLite versions
+    _BATCH_SIZE = 999
+
+    # Serialization failure and deadlock
+    _RETRYABLE_SQLSTATES = ("40001", "40P01")
+    # Connection exceptions, and server shutdown or startup
+    _RETRYABLE_SQLSTATE_PREFIXES = ("08", "57P0")
 
     def __init__(self, engine: Engine, table_name: str, schema: Optional[str] = None):
-        self._engine = engine
+        self._engine_instance = engine
+        self._engine_url = engine.url
+        self._engine_pid = os.getpid()
         md_args = {"schema": schema} if schema is not None else {}
         self._metadata = sa.MetaData(**md_args)
         try:
@@ -18,6 +87,38 @@ class Sql(storage_backend.StorageBackend[KeyType, Dict[str, types.JsonSerializab
         except sa.exc.NoSuchTableError:
             raise KeyError(f"Table {table_name} does not exist")
         self._assert_one_pk()
+        self._metadata_table = sa.Table(
+                f"{table_name}_metadata",
+                self._metadata,
+                sa.Column("key", self._primary_key.type, primary_key = True),
+                sa.Column("metadata", sa.Text, nullable = False))
+        self._metadata_table_exists = False
+
+    @property
+    def _engine(self) -> Engine:
+        if self._engine_pid != os.getpid():
+            try:
+                self._engine_instance.dispose(close = False)
+            except TypeError:
+                # SQLAlchemy before 1.4.33 has no close argument, and
+                # dispose would close the parent's connections.
+                self._engine_instance.pool = self._engine_instance.pool.recreate()
+            self._engine_pid = os.getpid()
+        return self._engine_instance
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_engine_instance"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._engine_instance = connections.get(
+                ("sql", self._engine_url),
+                lambda: sa.create_engine(self._engine_url),
+                close = lambda e: e.dispose(),
+                per_thread = False)
+        self._engine_pid = os.getpid()
 
     @property
     def _primary_key(self):
@@ -50,6 +151,186 @@ class Sql(storage_backend.StorageBackend[KeyType, Dict[str, types.JsonSerializab
         with self._engine.connect() as con:
             return con.execute(sa.select(self._primary_key)).fetchall()
 
+    def delete(self, key: KeyType) -> None:
+        with self._engine.begin() as con:
+            if not self._exists(con, key):
+                raise KeyError(f"Data for {key} does not exist")
+            self._delete(con, key)
+            if self._has_metadata_table(con):
+                table = self._metadata_table
+                con.execute(table.delete().where(table.c.key == key))
+
+    @property
+    def columns(self) -> sa.sql.base.ImmutableColumnCollection:
+        """
+        The columns of the table, for building where clauses for read_frame.
+        """
+        return self._table.c
+
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Lost connections, deadlocks, serialization failures, server
+        shutdowns and (on SQLite) locked databases are transient. Other
+        errors, including most OperationalErrors (i.e. missing tables,
+        failed authentication), are not.
+        """
+        if isinstance(error, sa.exc.DisconnectionError):
+            return True
+        if not isinstance(error, sa.exc.DBAPIError):
+            return False
+        if error.connection_invalidated:
+            return True
+        if (code := getattr(error.orig, "pgcode", None)) is not None:
+            return code in self._RETRYABLE_SQLSTATES or code.startswith(self._RETRYABLE_SQLSTATE_PREFIXES)
+        return isinstance(error.orig, sqlite3.OperationalError) and "locked" in str(error.orig)
+
+    def store_frame(self, frame: pd.DataFrame, chunksize: int = 100_000) -> None:
+        """
+        store_frame
+        ===========
+
+        parameters:
+            frame (pandas.DataFrame): Rows to store, with the primary key as index or column
+            chunksize (int): Number of rows serialized or inserted at a time = 100000
+
+        Stores the rows of a DataFrame in a single transaction, replacing
+        existing rows with the same keys.
+
+        On PostgreSQL, the rows are streamed as CSV through COPY FROM STDIN
+        into a temporary table, which then replaces the matching rows of the
+        target table. Other databases get the rows through executemany.
+        """
+        frame = self._frame_rows(frame)
+        with self._engine.begin() as con:
+            if con.dialect.name == "postgresql":
+                self._copy_frame(con, frame, chunksize)
+            else:
+                self._insert_frame(con, frame, chunksize)
+
+    def read_frame(self,
+            keys: Optional[Iterable[KeyType]] = None,
+            where: Optional[sa.sql.ClauseElement] = None) -> pd.DataFrame:
+        """
+        read_frame
+        ==========
+
+        parameters:
+            keys (Optional[Iterable[KeyType]]): Keys of the rows to read
+            where (Optional[sqlalchemy.sql.ClauseElement]): Condition on Sql.columns
+
+        returns:
+            pandas.DataFrame
+
+        Reads the selected rows (all rows if neither keys nor where is given)
+        into a DataFrame indexed by the primary key.
+        """
+        query = sa.select(self._table)
+        if where is not None:
+            query = query.where(where)
+
+        index = self._primary_key.name
+        with self._engine.connect() as con:
+            if keys is None:
+                return pd.read_sql(query, con, index_col = index)
+
+            keys = list(keys)
+            batches = [keys[i: i + self._BATCH_SIZE] for i in range(0, len(keys), self._BATCH_SIZE)] or [[]]
+            return pd.concat([
+                pd.read_sql(query.where(self._primary_key.in_(batch)), con, index_col = index)
+                for batch in batches])
+
+    def store_metadata(self, key: KeyType, metadata: Dict[str, types.JsonSerializable]) -> None:
+        self.store_metadata_many({key: metadata})
+
+    def store_metadata_many(self, items: Dict[KeyType, Dict[str, types.JsonSerializable]]) -> None:
+        table = self._metadata_table
+        with self._engine.begin() as con:
+            if not self._has_metadata_table(con):
+                table.create(con)
+                self._metadata_table_exists = True
+            con.execute(table.delete().where(table.c.key.in_(list(items))))
+            con.execute(table.insert(), [{"key": k, "metadata": json.dumps(m)} for k, m in items.items()])
+
+    def retrieve_metadata(self, key: KeyType) -> Dict[str, types.JsonSerializable]:
+        return self.retrieve_metadata_many([key])[key]
+
+    def retrieve_metadata_many(self,
+            keys: Iterable[KeyType],
+            skip_missing: bool = False) -> Dict[KeyType, Dict[str, types.JsonSerializable]]:
+        keys = list(keys)
+        table = self._metadata_table
+        records = {}
+        with self._engine.connect() as con:
+            if self._has_metadata_table(con):
+                for i in range(0, len(keys), self._BATCH_SIZE):
+                    batch = keys[i: i + self._BATCH_SIZE]
+                    rows = con.execute(sa.select(table.c.key, table.c.metadata).where(table.c.key.in_(batch)))
+                    records.update({k: json.loads(m) for k, m in rows})
+        if not skip_missing and (missing := [str(k) for k in keys if k not in records]):
+            raise KeyError(f"No metadata for {', '.join(missing)}")
+        return records
+
+    def _frame_rows(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Moves the primary key to a column, checks that all columns are in the
+        table, serializes JSON columns and makes integer columns integer.
+        """
+        if self._primary_key.name in frame.index.names:
+            frame = frame.reset_index()
+        names = [f for f, _ in self.fields]
+        if missing := [str(c) for c in frame.columns if c not in names]:
+            raise ValueError((
+                f"Fields {', '.join(missing)} not present in target table "
+                f"(Available fields: {', '.join(names)})"
+                ))
+        if self._primary_key.name not in frame.columns:
+            raise ValueError(f"Frame has no {self._primary_key.name} column or index level")
+
+        json_columns = [c for c in frame.columns if isinstance(self._table.columns[c].type, sa.JSON)]
+        if json_columns:
+            frame = frame.assign(**{c: frame[c].map(json.dumps) for c in json_columns})
+
+        # Integer columns with missing values are float in pandas, and would
+        # be written as i.e. 1.0, which COPY does not accept for integers.
+        float_columns = [
+                c for c in frame.columns
+                if isinstance(self._table.columns[c].type, sa.Integer) and frame[c].dtype.kind == "f"]
+        if float_columns:
+            frame = frame.astype({c: "Int64" for c in float_columns})
+        return frame
+
+    def _copy_frame(self, con: Connection, frame: pd.DataFrame, chunksize: int):
+        quote = con.dialect.identifier_preparer.quote
+        table = con.dialect.identifier_preparer.format_table(self._table)
+        staging = quote(f"_staging_{self._table.name}")
+        columns = ", ".join(quote(c) for c in frame.columns)
+        key = quote(self._primary_key.name)
+
+        cursor = con.connection.cursor()
+        cursor.execute(f"create temporary table {staging} (like {table} including defaults) on commit drop")
+        cursor.copy_expert(
+                f"copy {staging} ({columns}) from stdin with (format csv, null '{_CsvStream.NULL}')",
+                _CsvStream(frame, chunksize),
+                size = 2 ** 20)
+        cursor.execute(f"delete from {table} t using {staging} s where t.{key} = s.{key}")
+        cursor.execute(f"insert into {table} ({columns}) select {columns} from {staging}")
+        cursor.close()
+
+    def _insert_frame(self, con: Connection, frame: pd.DataFrame, chunksize: int):
+        for start in range(0, len(frame), chunksize):
+            chunk = frame.iloc[start: start + chunksize]
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            keys = chunk[self._primary_key.name].tolist()
+            for i in range(0, len(keys), self._BATCH_SIZE):
+                con.execute(self._table.delete().where(self._primary_key.in_(keys[i: i + self._BATCH_SIZE])))
+            con.execute(self._table.insert(), chunk.to_dict("records"))
+
+    def _has_metadata_table(self, con: Connection) -> bool:
+        if not self._metadata_table_exists:
+            table = self._metadata_table
+            self._metadata_table_exists = sa.inspect(con).has_table(table.name, schema = table.schema)
+        return self._metadata_table_exists
+
     def _retrieve(self, con: Connection, key: KeyType):
         query = self._table.select().where(self._primary_key == key)
         res = con.execute(query).fetchone()
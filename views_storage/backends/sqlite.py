@@ -0,0 +1,172 @@
+
+import os
+import json
+import sqlite3
+from typing import Any, Dict, Iterable, List
+from views_storage import types
+from . import storage_backend, connections
+
+class Sqlite(storage_backend.StorageBackend[str, bytes]):
+    """
+    Sqlite
+    ======
+
+    parameters:
+        path (str): Path to the database file, which is created if missing
+        table_name (str): Table holding the values = "objects"
+        timeout (float): Seconds to wait for a lock held by another writer = 30
+        synchronous (str): SQLite synchronous setting, "FULL" to survive power loss = "NORMAL"
+
+    Backend that stores values as blobs in a single SQLite file, which avoids
+    the per-file (or per-blob) overhead of other backends when storing many
+    small values. Metadata is stored in the table "<table_name>_metadata".
+
+    The database is put in WAL mode, allowing readers to proceed while another
+    process writes. Each process and thread gets its own connection (see
+    backends.connections). WAL mode requires the file to be on a local
+    filesystem.
+    """
+
+    # Max. number of bound parameters per statement in older SQLite versions
+    _BATCH_SIZE = 999
+
+    def __init__(self,
+            path: str,
+            table_name: str = "objects",
+            timeout: float = 30,
+            synchronous: str = "NORMAL"):
+        self._db_path = path
+        self._table_name = table_name
+        self._timeout = timeout
+        self._synchronous = synchronous
+
+        with self._connection as con:
+            con.execute("pragma journal_mode = wal")
+            con.execute(self._sql(
+                    "create table if not exists {table} (key text primary key, value blob not null)"))
+            con.execute(self._sql(
+                    "create table if not exists {metadata_table} (key text primary key, metadata text not null)"))
+
+    def store(self, key: str, value: bytes) -> None:
+        with self._connection as con:
+            con.execute(self._sql("insert or replace into {table} (key, value) values (?, ?)"), (key, value))
+
+    def retrieve(self, key: str) -> bytes:
+        row = self._connection.execute(self._sql("select value from {table} where key = ?"), (key,)).fetchone()
+        if row is None:
+            raise KeyError(f"{key} does not exist")
+        return row[0]
+
+    def exists(self, key: str) -> bool:
+        query = self._sql("select exists(select 1 from {table} where key = ?)")
+        return bool(self._connection.execute(query, (key,)).fetchone()[0])
+
+    def keys(self) -> List[str]:
+        return [k for k, in self._connection.execute(self._sql("select key from {table}"))]
+
+    def delete(self, key: str) -> None:
+        with self._connection as con:
+            if con.execute(self._sql("delete from {table} where key = ?"), (key,)).rowcount == 0:
+                raise KeyError(f"{key} does not exist")
+            con.execute(self._sql("delete from {metadata_table} where key = ?"), (key,))
+
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Lock contention that outlasted the timeout is transient.
+        """
+        return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+    def store_many(self, items: Dict[str, bytes]) -> None:
+        """
+        store_many
+        ==========
+
+        parameters:
+            items (Dict[str, bytes])
+
+        Stores all items in a single transaction.
+        """
+        with self._connection as con:
+            con.executemany(
+                    self._sql("insert or replace into {table} (key, value) values (?, ?)"),
+                    items.items())
+
+    def retrieve_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """
+        retrieve_many
+        =============
+
+        parameters:
+            keys (Iterable[str])
+
+        returns:
+            Dict[str, bytes]
+
+        Fetches values in batches, raising KeyError if any key is missing.
+        """
+        keys = list(keys)
+        values = self._select_many("select key, value from {table} where key in ({parameters})", keys)
+        if missing := [k for k in keys if k not in values]:
+            raise KeyError(f"{', '.join(missing)} does not exist")
+        return values
+
+    def size(self, key: str) -> int:
+        if (size := self.size_many([key]).get(key)) is None:
+            raise KeyError(f"{key} does not exist")
+        return size
+
+    def size_many(self, keys: Iterable[str]) -> Dict[str, int]:
+        return self._select_many("select key, length(value) from {table} where key in ({parameters})", list(keys))
+
+    def store_metadata(self, key: str, metadata: Dict[str, types.JsonSerializable]) -> None:
+        self.store_metadata_many({key: metadata})
+
+    def store_metadata_many(self, items: Dict[str, Dict[str, types.JsonSerializable]]) -> None:
+        with self._connection as con:
+            con.executemany(
+                    self._sql("insert or replace into {metadata_table} (key, metadata) values (?, ?)"),
+                    ((k, json.dumps(m)) for k, m in items.items()))
+
+    def retrieve_metadata(self, key: str) -> Dict[str, types.JsonSerializable]:
+        return self.retrieve_metadata_many([key])[key]
+
+    def retrieve_metadata_many(self,
+            keys: Iterable[str],
+            skip_missing: bool = False) -> Dict[str, Dict[str, types.JsonSerializable]]:
+        keys = list(keys)
+        records = self._select_many("select key, metadata from {metadata_table} where key in ({parameters})", keys)
+        if not skip_missing and (missing := [k for k in keys if k not in records]):
+            raise KeyError(f"No metadata for {', '.join(missing)}")
+        return {k: json.loads(m) for k, m in records.items()}
+
+    def close(self) -> None:
+        """
+        Close the connections opened for this database in this process.
+        """
+        connections.close(self._connection_key)
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        return connections.get(self._connection_key, self._connect, close = lambda c: c.close())
+
+    @property
+    def _connection_key(self):
+        return ("sqlite", os.path.abspath(self._db_path), self._timeout, self._synchronous)
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self._db_path, timeout = self._timeout, cached_statements = 256)
+        con.execute(f"pragma synchronous = {self._synchronous}")
+        return con
+
+    def _sql(self, template: str, parameters: str = "") -> str:
+        return template.format(
+                table = f'"{self._table_name}"',
+                metadata_table = f'"{self._table_name}_metadata"',
+                parameters = parameters)
+
+    def _select_many(self, template: str, keys: List[str]) -> Dict[str, Any]:
+        rows = {}
+        for start in range(0, len(keys), self._BATCH_SIZE):
+            batch = keys[start: start + self._BATCH_SIZE]
+            rows.update(self._connection.execute(self._sql(template, ", ".join("?" * len(batch))), batch))
+        return rows
@@ -1,5 +1,8 @@
+import os
+import uuid
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from typing import Dict, Generic, Iterable, TypeVar
+from views_storage import types
 
 T = TypeVar("T")
 U = TypeVar("U")
@@ -33,3 +36,211 @@ class StorageBackend(ABC, Generic[T, U]):
     @abstractmethod
     def keys(self):
         raise NotImplementedError()
+
+    def delete(self, key: T) -> None:
+        """
+        delete
+        ======
+
+        parameters:
+            key (T)
+
+        Removes the value and metadata at key, raising KeyError if there is
+        no value.
+        """
+        raise NotImplementedError()
+
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        is_retryable
+        ============
+
+        parameters:
+            error (Exception)
+
+        returns:
+            bool
+
+        Whether error is likely transient, so that repeating the failed
+        operation may succeed. Used by backends.retrying.Retrying.
+        """
+        return False
+
+    def store_many(self, items: Dict[T, U]) -> None:
+        """
+        store_many
+        ==========
+
+        parameters:
+            items (Dict[T, U])
+
+        Stores several values. Backends that can batch writes override this.
+        """
+        for key, value in items.items():
+            self.store(key, value)
+
+    def retrieve_many(self, keys: Iterable[T]) -> Dict[T, U]:
+        """
+        retrieve_many
+        =============
+
+        parameters:
+            keys (Iterable[T])
+
+        returns:
+            Dict[T, U]
+
+        Fetches several values. Backends that can batch reads override this.
+        """
+        return {key: self.retrieve(key) for key in keys}
+
+    def size(self, key: T) -> int:
+        """
+        size
+        ====
+
+        parameters:
+            key (T)
+
+        returns:
+            int
+
+        The size in bytes of the value at key, raising KeyError if there is
+        no value. Backends that can tell without fetching the value override
+        this.
+        """
+        return len(self.retrieve(key))
+
+    def size_many(self, keys: Iterable[T]) -> Dict[T, int]:
+        """
+        size_many
+        =========
+
+        parameters:
+            keys (Iterable[T])
+
+        returns:
+            Dict[T, int]
+
+        The sizes of several values. Keys with no value are left out.
+        """
+        sizes = {}
+        for key in keys:
+            try:
+                sizes[key] = self.size(key)
+            except KeyError:
+                pass
+        return sizes
+
+    def store_metadata(self, key: T, metadata: Dict[str, types.JsonSerializable]) -> None:
+        """
+        store_metadata
+        ==============
+
+        parameters:
+            key (T)
+            metadata (Dict[str, JsonSerializable])
+
+        Stores a small record describing the value at key, in a place where
+        it can be fetched without fetching the value. Backends that cannot
+        store metadata leave this as is, which discards the record.
+        """
+
+    def retrieve_metadata(self, key: T) -> Dict[str, types.JsonSerializable]:
+        """
+        retrieve_metadata
+        =================
+
+        parameters:
+            key (T)
+
+        returns:
+            Dict[str, JsonSerializable]
+
+        Fetches the record stored with store_metadata, raising KeyError if
+        there is none.
+        """
+        raise KeyError(f"No metadata for {key}")
+
+    @property
+    def supports_metadata(self) -> bool:
+        """
+        Whether store_metadata keeps records, rather than discarding them.
+        """
+        return type(self).store_metadata is not StorageBackend.store_metadata
+
+    def store_metadata_many(self, items: Dict[T, Dict[str, types.JsonSerializable]]) -> None:
+        for key, metadata in items.items():
+            self.store_metadata(key, metadata)
+
+    def retrieve_metadata_many(self,
+            keys: Iterable[T],
+            skip_missing: bool = False) -> Dict[T, Dict[str, types.JsonSerializable]]:
+        """
+        retrieve_metadata_many
+        ======================
+
+        parameters:
+            keys (Iterable[T])
+            skip_missing (bool): Leave out keys without metadata, rather than raising KeyError = False
+
+        returns:
+            Dict[T, Dict[str, JsonSerializable]]
+
+        Fetches several metadata records. Backends that can batch reads
+        override this.
+        """
+        records = {}
+        for key in keys:
+            try:
+                records[key] = self.retrieve_metadata(key)
+            except KeyError:
+                if not skip_missing:
+                    raise
+        return records
+
+def temporary_path(path: str) -> str:
+    """
+    temporary_path
+    ==============
+
+    parameters:
+        path (str)
+
+    returns:
+        str
+
+    A unique, hidden name next to path, used to write a file before renaming
+    it into place.
+    """
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.{uuid.uuid4().hex}.tmp")
+
+def is_temporary(name: str) -> bool:
+    """
+    Whether a file name was made by temporary_path.
+    """
+    return name.startswith(".") and name.endswith(".tmp")
+
+def metadata_path(path: str) -> str:
+    """
+    metadata_path
+    =============
+
+    parameters:
+        path (str)
+
+    returns:
+        str
+
+    The hidden sidecar file next to path, used by file based backends to
+    store metadata.
+    """
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.meta.json")
+
+def is_metadata(name: str) -> bool:
+    """
+    Whether a file name was made by metadata_path.
+    """
+    return name.startswith(".") and name.endswith(".meta.json")
@@ -0,0 +1,72 @@
+"""
+checksums
+=========
+
+Checksums used to detect values that were truncated or corrupted in storage.
+Checksums are strings of the form "<algorithm>:<hex digest>", so that values
+written with one algorithm can be verified after the default has changed.
+
+xxHash (XXH3, 128 bits) is used if the xxhash package is installed, since it
+hashes several times faster than the hash functions in hashlib. Otherwise,
+BLAKE2b with a 128 bit digest is used.
+"""
+import hashlib
+from typing import Callable, Dict, Optional
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+class ChecksumError(IOError):
+    """
+    ChecksumError
+    =============
+
+    Raised when a stored value does not match the size or checksum recorded
+    when it was written.
+    """
+
+def _blake2b(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size = 16).hexdigest()
+
+ALGORITHMS: Dict[str, Callable[[bytes], str]] = {"blake2b": _blake2b}
+
+if xxhash is not None:
+    ALGORITHMS["xxh3_128"] = lambda data: xxhash.xxh3_128_hexdigest(data)
+    DEFAULT_ALGORITHM = "xxh3_128"
+else:
+    DEFAULT_ALGORITHM = "blake2b"
+
+def checksum(data: bytes, algorithm: str = DEFAULT_ALGORITHM) -> str:
+    """
+    checksum
+    ========
+
+    parameters:
+        data (bytes)
+        algorithm (str): Name of the hash function = DEFAULT_ALGORITHM
+
+    returns:
+        str: "<algorithm>:<hex digest>"
+    """
+    return f"{algorithm}:{ALGORITHMS[algorithm](data)}"
+
+def matches(data: bytes, expected: str) -> Optional[bool]:
+    """
+    matches
+    =======
+
+    parameters:
+        data (bytes)
+        expected (str): A checksum made with checksum()
+
+    returns:
+        Optional[bool]: None if the algorithm of expected is not available
+
+    Checks data against a checksum, using the algorithm it was made with.
+    """
+    algorithm, _, _ = expected.partition(":")
+    if algorithm not in ALGORITHMS:
+        return None
+    return checksum(data, algorithm) == expected
@@ -1,16 +1,32 @@
 from abc import ABC
-from typing import Generic, TypeVar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Generic, Iterable, List, Optional, TypeVar
 from .serializers import serializer
 from .backends import storage_backend
+from .single_flight import SingleFlight
+from . import metadata, checksums, models
 
 T = TypeVar("T")
 
+VERSIONS_PREFIX = ".versions/"
 
 class KeyValueStore(Generic[T]):
     """
     KeyValueStore
     =============
 
+    parameters:
+        backend (views_storage.backends.storage_backend.StorageBackend)
+        serializer (views_storage.serializers.serializer.Serializer)
+        record_metadata (bool): Store a metadata record with each write = True
+        versioned (bool): Keep previous versions of overwritten values = False
+        keep_versions (Optional[int]): Max. number of versions kept per key = None
+        max_version_age (Optional[timedelta]): Max. age of kept versions = None
+        single_flight (bool): Share reads of a key between concurrent callers = False
+        memoize_ttl (Optional[float]): Seconds to keep returning a shared read = None
+        memoize_size (int): Max. number of reads kept for memoize_ttl = 128
+        verify_checksums (bool): Check values against their metadata on read = False
+
     Abstract class for a key-value store combining a storage backend with a
     serializer-deserializer. Generalizes key-value storage across multiple
     backends.
@@ -18,11 +34,65 @@ class KeyValueStore(Generic[T]):
     Subclasses should override __init__, setting the self.backend and
     self.serializer values to subclasses of storage_backend.StorageBackend and
     serializer.Serializer respectively.
+
+    Unless record_metadata is False, each write also stores a small metadata
+    record (see views_storage.metadata) with the backend, which info and
+    info_many return without fetching the value. Backends that do not
+    implement store_metadata and retrieve_metadata discard the record, and
+    info raises KeyError.
+
+    In versioned mode, each write also stores the value as an immutable,
+    numbered version below ".versions/", which can be read with
+    read(key, version = ...). The latest value is still stored at the key
+    itself, so reading it costs a single retrieve. The version list is kept
+    in the metadata record of the key. Versions beyond keep_versions, or
+    older than max_version_age, are deleted on write and by prune, but the
+    latest version is always kept. Versioned writes to the same key must not
+    run concurrently.
+
+    With single_flight, concurrent reads of the same key (and version) in one
+    process share a single retrieve and deserialization (see
+    views_storage.single_flight), and with memoize_ttl the deserialized value
+    is reused for that many seconds, for at most memoize_size keys (the
+    most recently read). Writes through the store invalidate these, but
+    writes by other processes are not seen before the ttl expires. Callers
+    sharing a read get the same object, and must not modify it in place.
+
+    The metadata records of bytes values include their size and a checksum
+    (see views_storage.checksums). With verify_checksums, each read also
+    fetches the metadata record, and raises checksums.ChecksumError if the
+    value does not match it, before deserializing the value. read_many
+    fetches the records of all keys at once. verify checks many stored
+    values at once.
     """
 
-    def __init__(self, backend: storage_backend.StorageBackend, serializer: serializer.Serializer):
+    def __init__(self,
+            backend: storage_backend.StorageBackend,
+            serializer: serializer.Serializer,
+            record_metadata: bool = True,
+            versioned: bool = False,
+            keep_versions: Optional[int] = None,
+            max_version_age: Optional[timedelta] = None,
+            single_flight: bool = False,
+            memoize_ttl: Optional[float] = None,
+            memoize_size: int = 128,
+            verify_checksums: bool = False):
+        if versioned and not (record_metadata and backend.supports_metadata):
+            raise ValueError("Versioned mode requires record_metadata, and a backend storing metadata")
+        if verify_checksums and not record_metadata:
+            raise ValueError("Verifying checksums requires record_metadata")
+
         self.backend = backend
         self.serializer = serializer
+        self.record_metadata = record_metadata
+        self.versioned = versioned
+        self.keep_versions = keep_versions
+        self.max_version_age = max_version_age
+        self.verify_checksums = verify_checksums
+        self._flights = (
+                SingleFlight(memoize_ttl, memoize_size)
+                if single_flight or memoize_ttl is not None
+                else None)
 
     def exists(self, key: str) -> bool:
         return self.backend.exists(key)
@@ -31,15 +101,199 @@ class KeyValueStore(Generic[T]):
         if self.exists(key) and not overwrite:
             raise FileExistsError("File exists, overwrite is False")
 
-        self.backend.store(key, self.serializer.serialize(value))
+        data = self.serializer.serialize(value)
+        record = metadata.describe(value, data, self.serializer) if self.record_metadata else None
+        if self.versioned:
+            self._write_version(key, data, record)
+        else:
+            self.backend.store(key, data)
+            if record is not None:
+                self.backend.store_metadata(key, record)
+        self._forget(key)
+
+    def read(self, key: str, version: Optional[int] = None) -> T:
+        if self._flights is None:
+            return self._read(key, version)
+        return self._flights.do((key, version), lambda: self._read(key, version))
 
-    def read(self, key: str) -> T:
+    def _read(self, key: str, version: Optional[int]) -> T:
+        expected = self._expected(key, version) if self.verify_checksums else None
         try:
-            raw = self.backend.retrieve(key)
+            raw = self.backend.retrieve(key if version is None else self._version_key(key, version))
             assert raw is not None
         except (KeyError, AssertionError):
-            raise KeyError(f"{key} does not exist")
+            raise KeyError(f"{key} does not exist" if version is None else f"{key} has no version {version}")
+
+        if expected is not None and not self._matches(raw, expected):
+            # The value may have been overwritten after its record was read.
+            # Writes store the value before the record, so a fresh record
+            # describes the value read, unless it is corrupt.
+            if not self._matches(raw, self._expected(key, version)):
+                raise checksums.ChecksumError(f"{key} does not match its recorded size or checksum")
         return self.serializer.deserialize(raw)
 
+    def write_many(self, items: Dict[str, T], overwrite: bool = False):
+        if not overwrite and (existing := [k for k in items if self.exists(k)]):
+            raise FileExistsError(f"Files {', '.join(existing)} exist, overwrite is False")
+
+        if self.versioned:
+            for key, value in items.items():
+                self.write(key, value, overwrite = True)
+            return
+
+        data = {k: self.serializer.serialize(v) for k, v in items.items()}
+        self.backend.store_many(data)
+        if self.record_metadata:
+            self.backend.store_metadata_many({
+                k: metadata.describe(items[k], d, self.serializer) for k, d in data.items()})
+        for key in items:
+            self._forget(key)
+
+    def read_many(self, keys: Iterable[str]) -> Dict[str, T]:
+        keys = list(keys)
+        expected = self.info_many(keys, skip_missing = True) if self.verify_checksums else {}
+        raw = self.backend.retrieve_many(keys)
+
+        if mismatched := [k for k, v in raw.items() if not self._matches(v, expected.get(k))]:
+            # See _read
+            fresh = self.info_many(mismatched, skip_missing = True)
+            if corrupt := [k for k in mismatched if not self._matches(raw[k], fresh.get(k))]:
+                raise checksums.ChecksumError(f"{', '.join(corrupt)} do not match their recorded size or checksum")
+        return {k: self.serializer.deserialize(v) for k, v in raw.items()}
+
+    def info(self, key: str) -> metadata.Metadata:
+        return self.backend.retrieve_metadata(key)
+
+    def info_many(self, keys: Iterable[str], skip_missing: bool = False) -> Dict[str, metadata.Metadata]:
+        return self.backend.retrieve_metadata_many(keys, skip_missing)
+
+    def verify(self, keys: Optional[Iterable[str]] = None, deep: bool = False) -> Dict[str, bool]:
+        """
+        verify
+        ======
+
+        parameters:
+            keys (Optional[Iterable[str]]): Keys to check, all keys if None = None
+            deep (bool): Also fetch each value and compare checksums = False
+
+        returns:
+            Dict[str, bool]: Whether each value matches its metadata record
+
+        Checks stored values against the size recorded when they were
+        written, which backends can tell without fetching the values. This
+        catches truncated values. With deep, values are also fetched and
+        checksummed, which catches any corruption. Values that are missing,
+        or have no record of their size, are reported as not matching. For
+        backends listing keys by folder, keys defaults to the top level files.
+        """
+        if keys is None:
+            keys = self.list()
+            keys = keys.files if isinstance(keys, models.Listing) else keys
+        keys = list(keys)
+        sizes = self.backend.size_many(keys)
+        records = self.info_many(keys, skip_missing = True)
+        result = {}
+        for key in keys:
+            expected = records.get(key, {})
+            result[key] = key in sizes and sizes[key] == expected.get("size")
+            if deep and result[key]:
+                try:
+                    result[key] = self._matches(self.backend.retrieve(key), expected)
+                except KeyError:
+                    result[key] = False
+        return result
+
+    def versions(self, key: str) -> List[Dict[str, Any]]:
+        """
+        versions
+        ========
+
+        parameters:
+            key (str)
+
+        returns:
+            List[Dict[str, Any]]
+
+        The kept versions of key, oldest first, each with its version number
+        and creation time (and size and checksum, if recorded).
+        """
+        return self.info(key).get("versions", [])
+
+    def prune(self, key: str) -> None:
+        """
+        prune
+        =====
+
+        parameters:
+            key (str)
+
+        Deletes the versions of key that are too many or too old to keep.
+        """
+        record = self.info(key)
+        kept, expired = self._expire(record.get("versions", []))
+        if expired:
+            self.backend.store_metadata(key, {**record, "versions": kept})
+            self._delete_versions(key, expired)
+
     def list(self):
-        return self.backend.keys()
+        keys = self.backend.keys()
+        if isinstance(keys, list):
+            keys = [k for k in keys if not (isinstance(k, str) and k.startswith(VERSIONS_PREFIX))]
+        return keys
+
+    def _forget(self, key: str):
+        if self._flights is not None:
+            self._flights.forget((key, None))
+
+    def _expected(self, key: str, version: Optional[int]) -> Optional[Dict[str, Any]]:
+        try:
+            record = self.info(key)
+        except KeyError:
+            return None
+        if version is None:
+            return record
+        return next((v for v in record.get("versions", []) if v["version"] == version), None)
+
+    @staticmethod
+    def _matches(raw: Any, expected: Optional[Dict[str, Any]]) -> bool:
+        if expected is None or not isinstance(raw, bytes):
+            return True
+        if "size" in expected and len(raw) != expected["size"]:
+            return False
+        return "checksum" not in expected or checksums.matches(raw, expected["checksum"]) is not False
+
+    def _write_version(self, key: str, data: Any, record: metadata.Metadata):
+        try:
+            versions = self.backend.retrieve_metadata(key).get("versions", [])
+        except KeyError:
+            versions = []
+
+        number = versions[-1]["version"] + 1 if versions else 1
+        entry = {"version": number, **{k: record[k] for k in ("created", "size", "checksum") if k in record}}
+        versions, expired = self._expire(versions + [entry])
+
+        self.backend.store(self._version_key(key, number), data)
+        self.backend.store(key, data)
+        self.backend.store_metadata(key, {**record, "version": number, "versions": versions})
+        self._delete_versions(key, expired)
+
+    def _expire(self, versions: List[Dict[str, Any]]):
+        kept = list(versions)
+        if self.max_version_age is not None:
+            cutoff = datetime.now(timezone.utc) - self.max_version_age
+            kept = [v for v in kept[:-1] if datetime.fromisoformat(v["created"]) >= cutoff] + kept[-1:]
+        if self.keep_versions is not None:
+            kept = kept[-max(self.keep_versions, 1):]
+        kept_numbers = {v["version"] for v in kept}
+        return kept, [v for v in versions if v["version"] not in kept_numbers]
+
+    def _delete_versions(self, key: str, versions: List[Dict[str, Any]]):
+        for version in versions:
+            try:
+                self.backend.delete(self._version_key(key, version["version"]))
+            except KeyError:
+                pass
+
+    @staticmethod
+    def _version_key(key: str, version: int) -> str:
+        return f"{VERSIONS_PREFIX}{key}/{version}"
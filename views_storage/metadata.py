@@ -0,0 +1,65 @@
+"""
+metadata
+========
+
+Describes stored values, so that questions about their shape and schema can
+be answered without fetching and deserializing them.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict
+import numpy as np
+import pandas as pd
+from . import types, checksums
+from .serializers import serializer
+
+Metadata = Dict[str, types.JsonSerializable]
+
+def describe(value: Any, data: Any, value_serializer: serializer.Serializer) -> Metadata:
+    """
+    describe
+    ========
+
+    parameters:
+        value (Any): The value being written
+        data (Any): The value as serialized
+        value_serializer (views_storage.serializers.serializer.Serializer)
+
+    returns:
+        Dict[str, JsonSerializable]
+
+    Makes a metadata record with the serializer name, a description of the
+    value and a timestamp. Size and checksum are included for bytes data.
+    """
+    record: Metadata = {
+            "serializer": type(value_serializer).__name__,
+            "created": datetime.now(timezone.utc).isoformat(),
+        }
+    if isinstance(data, bytes):
+        record["size"] = len(data)
+        record["checksum"] = checksums.checksum(data)
+    record.update(describe_value(value))
+    return record
+
+def describe_value(value: Any) -> Metadata:
+    if isinstance(value, pd.DataFrame):
+        return {
+                "type": "DataFrame",
+                "shape": list(value.shape),
+                "columns": [str(c) for c in value.columns],
+                "dtypes": [str(d) for d in value.dtypes],
+                "index": [str(n) for n in value.index.names],
+            }
+    if isinstance(value, pd.Series):
+        return {
+                "type": "Series",
+                "shape": list(value.shape),
+                "dtypes": [str(value.dtype)],
+                "index": [str(n) for n in value.index.names],
+            }
+    if isinstance(value, np.ndarray):
+        return {
+                "type": "ndarray",
+                "shape": list(value.shape),
+                "dtypes": [str(value.dtype)],
+            }
+    return {"type": type(value).__name__}
@@ -1,6 +1,8 @@
 from typing import List
+from dataclasses import dataclass
 #from pydantic import BaseModel
 
+@dataclass
 class Listing():
     """
     A directory listing, separating folders and files.
@@ -6,5 +6,6 @@ These classes are used to serialize and deserialize python objects via various
 file formats.
 """
 from .csv import Csv
+from .dispatch import Dispatch
 from .parquet import Parquet
 from .pickle import Pickle
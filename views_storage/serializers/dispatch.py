@@ -0,0 +1,110 @@
+import io
+import json
+import pickle
+from typing import Any
+import lz4.frame
+import numpy as np
+import pandas as pd
+
+from . import serializer
+
+MAGIC = b"VSD"
+
+PARQUET = b"P"
+NUMPY = b"N"
+JSON = b"J"
+PICKLE = b"K"
+
+PARQUET_MAGIC = b"PAR1"
+LZ4_MAGIC = b"\x04\x22\x4d\x18"
+
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+def is_plain(obj: Any) -> bool:
+    """
+    is_plain
+    ========
+
+    parameters:
+        obj (Any)
+
+    returns:
+        bool
+
+    Whether obj is made up only of dicts with str keys, lists, and str, int,
+    float, bool and None, so that it is unchanged by a JSON round trip.
+    Subclasses (such as numpy scalars or tuples) are not plain.
+    """
+    if type(obj) in _JSON_SCALARS:
+        return True
+    if type(obj) is list:
+        return all(is_plain(v) for v in obj)
+    if type(obj) is dict:
+        return all(type(k) is str and is_plain(v) for k, v in obj.items())
+    return False
+
+class Dispatch(serializer.Serializer[Any, bytes]):
+    def __init__(self, compression: bool = True):
+        """
+        Dispatch
+        ========
+
+        parameters:
+            compression (bool): Whether to compress pickled values using LZ4
+
+        Serializes each value in the fastest format for its type, so that
+        DataFrames, arrays and other objects can share one store:
+
+        * DataFrames as Parquet
+        * numpy arrays (except object arrays) in the .npy format
+        * plain dicts (see is_plain) as JSON
+        * anything else, or DataFrames that Parquet cannot hold, pickled
+
+        The format is written in a short header, which deserialize reads to
+        pick the format. Data written by the Parquet and Pickle serializers
+        has no header, but is recognized as well.
+        """
+        self._compression = compression
+
+    def serialize(self, obj: Any) -> bytes:
+        if isinstance(obj, pd.DataFrame):
+            try:
+                return MAGIC + PARQUET + obj.to_parquet(index = True, engine = "pyarrow")
+            except (ValueError, TypeError, NotImplementedError):
+                # Non-string column names, mixed type columns, etc.
+                pass
+        elif isinstance(obj, np.ndarray) and not obj.dtype.hasobject:
+            buffer = io.BytesIO()
+            buffer.write(MAGIC + NUMPY)
+            np.lib.format.write_array(buffer, obj, allow_pickle = False)
+            return buffer.getvalue()
+        elif type(obj) is dict and is_plain(obj):
+            return MAGIC + JSON + json.dumps(obj).encode()
+
+        data = pickle.dumps(obj, protocol = pickle.HIGHEST_PROTOCOL)
+        if self._compression:
+            data = lz4.frame.compress(data)
+        return MAGIC + PICKLE + data
+
+    def deserialize(self, data: bytes) -> Any:
+        if not data.startswith(MAGIC):
+            return self._deserialize_untagged(data)
+
+        tag, body = data[len(MAGIC): len(MAGIC) + 1], memoryview(data)[len(MAGIC) + 1:]
+        if tag == PARQUET:
+            return pd.read_parquet(io.BytesIO(body))
+        if tag == NUMPY:
+            return np.lib.format.read_array(io.BytesIO(body), allow_pickle = False)
+        if tag == JSON:
+            return json.loads(bytes(body))
+        if tag == PICKLE:
+            return pickle.loads(lz4.frame.decompress(body) if body[:4] == LZ4_MAGIC else body)
+        raise ValueError(f"Unknown format {tag!r}")
+
+    @staticmethod
+    def _deserialize_untagged(data: bytes) -> Any:
+        if data.startswith(PARQUET_MAGIC):
+            return pd.read_parquet(io.BytesIO(data))
+        if data.startswith(LZ4_MAGIC):
+            return pickle.loads(lz4.frame.decompress(data))
+        return pickle.loads(data)
@@ -1,10 +1,27 @@
 from typing import Optional
-import os
-from cryptography import x509
 from .serializers import serializer
 from . import key_value_store, backends, serializers, models
 
 class SftpStorage(key_value_store.KeyValueStore):
+    """
+    SftpStorage
+    ===========
+
+    parameters:
+        host (str): Host of both the SFTP server and the key database
+        port (int): Port of the key database = 5432
+        dbname (str): Name of the key database = "postgres"
+        sslmode (str): SSL mode used to connect to the key database = "require"
+        user (Optional[str]): Key database user, read from the client certificate if None = None
+        folder (str): Folder on the SFTP server holding the values = "."
+        serializer (Optional[Serializer]): Serializer, serializers.Dispatch() if None = None
+        sftp_port (int): Port of the SFTP server = 22
+        sftp_user (str): The dedicated, low privileged user of the SFTP server
+
+    Key-value store on an SFTP server. By default, values are stored with
+    serializers.Dispatch, so that DataFrames, arrays and other objects can
+    share one store and one connection.
+    """
     def __init__(
         self,
         host: str,
@@ -13,10 +30,24 @@ class SftpStorage(key_value_store.KeyValueStore):
         sslmode: str = "require",
         user: Optional[str] = None,
         folder: str = ".",
+        serializer: Optional[serializer.Serializer] = None,
+        sftp_port: int = 22,
+        *,
+        sftp_user: str,
     ):
-        user = user if user is not None else get_cert_username()
-        self.backend = backends.Sftp(user, host, port, dbname, sslmode, folder = folder)
-        super().__init__()
+        user = user if user is not None else backends.Sftp.get_cert_username()
+        super().__init__(
+                backend = backends.Sftp(
+                    host,
+                    sftp_port,
+                    sftp_user,
+                    key_db_host = host,
+                    key_db_dbname = dbname,
+                    key_db_user = user,
+                    key_db_sslmode = sslmode,
+                    key_db_port = port,
+                    folder = folder),
+                serializer = serializer if serializer is not None else serializers.Dispatch())
 
     def list(self, path: str = ".") -> models.Listing:
         return self.backend.list(path)
@@ -31,9 +62,13 @@ class SftpDataStorage(SftpStorage):
         user: Optional[str] = None,
         folder: str = ".",
         serializer: Optional[serializer.Serializer] = None,
+        *,
+        sftp_user: str,
     ):
-        self.serializer = serializer if serializer is not None else serializers.Parquet()
-        super().__init__(host, port, dbname, sslmode = sslmode, user = user, folder = folder)
+        serializer = serializer if serializer is not None else serializers.Parquet()
+        super().__init__(
+                host, port, dbname, sslmode = sslmode, user = user, folder = folder,
+                serializer = serializer, sftp_user = sftp_user)
 
 
 class SftpObjectStorage(SftpStorage):
@@ -45,7 +80,9 @@ class SftpObjectStorage(SftpStorage):
         sslmode: str = "require",
         user: Optional[str] = None,
         folder: str = ".",
+        *,
+        sftp_user: str,
     ):
-        self.serializer = serializers.Pickle()
-        super().__init__(host, port, dbname, sslmode = sslmode, user = user, folder = folder)
-
+        super().__init__(
+                host, port, dbname, sslmode = sslmode, user = user, folder = folder,
+                serializer = serializers.Pickle(), sftp_user = sftp_user)
@@ -0,0 +1,120 @@
+"""
+single_flight
+=============
+
+Coalesces concurrent calls for the same key into a single call.
+"""
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+class SingleFlight(Generic[V]):
+    """
+    SingleFlight
+    ============
+
+    parameters:
+        ttl (Optional[float]): Seconds to keep returning a result after it is produced = None
+        max_entries (int): Max. number of memoized results = 128
+
+    Runs at most one call per key at a time. Callers asking for a key that
+    is already being fetched wait for that call and get its result (or
+    exception), rather than making a call of their own. With a ttl, results
+    are also memoized, and returned without a call until they expire. At
+    most max_entries results are memoized, dropping the least recently used.
+
+    Everyone sharing a call gets the same object, which must therefore not
+    be modified in place.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 128):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._memo: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+
+    def do(self, key: Hashable, fn: Callable[[], V]) -> V:
+        """
+        do
+        ==
+
+        parameters:
+            key (Hashable)
+            fn (Callable[[], V])
+
+        returns:
+            V
+
+        Returns the result of fn, or of the call in flight for key.
+        """
+        with self._lock:
+            if (memoized := self._memo.get(key)) is not None:
+                if memoized[0] > time.monotonic():
+                    self._memo.move_to_end(key)
+                    return memoized[1]
+                del self._memo[key]
+
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+
+        if not leader:
+            return call.result()
+
+        try:
+            value = fn()
+        except BaseException as e:
+            with self._lock:
+                self._end(key, call)
+            call.set_exception(e)
+            raise
+
+        with self._lock:
+            if self._end(key, call) and self._ttl is not None:
+                self._memoize(key, value)
+        call.set_result(value)
+        return value
+
+    def forget(self, key: Hashable) -> None:
+        """
+        forget
+        ======
+
+        parameters:
+            key (Hashable)
+
+        Drops the memoized result for key, and detaches any call in flight,
+        so that later callers make a new call. Used when the underlying
+        value changes.
+        """
+        with self._lock:
+            self._memo.pop(key, None)
+            self._calls.pop(key, None)
+
+    def _end(self, key: Hashable, call: Future) -> bool:
+        """
+        Removes call from the calls in flight, returning False if it had
+        already been detached by forget.
+        """
+        if self._calls.get(key) is call:
+            del self._calls[key]
+            return True
+        return False
+
+    def _memoize(self, key: Hashable, value: V):
+        self._memo[key] = (time.monotonic() + self._ttl, value)
+        self._memo.move_to_end(key)
+        while len(self._memo) > self._max_entries:
+            self._memo.popitem(last = False)
+
+    def __getstate__(self):
+        return {"ttl": self._ttl, "max_entries": self._max_entries}
+
+    def __setstate__(self, state):
+        self.__init__(state["ttl"], state.get("max_entries", 128))